@@ -1,35 +1,63 @@
 # stalequant 2025-04-02
 
+import argparse
+import asyncio
+import datetime
 import json
 import math
-from typing import Any, cast
+import os
+from collections.abc import Callable
+from typing import Any
 import time
-from concurrent.futures import ThreadPoolExecutor
-from typing import Literal, TypedDict
+import warnings
+from typing import Literal
 
-import ccxt
+import ccxt.async_support as ccxt_async
 import numpy as np
 import pandas as pd
-import requests
-from ccxt.base.exchange import Exchange
-
-import datetime
-
-
-### Types
-
-type Coin = str
-type ExchangeName = str
-type Symbol = str
-type CatLabel = str
-type SpotFut = Literal["spot", "futures"]
-
-
-class CutoffSpec(TypedDict):
-    kind: Literal["exp", "linear", "reverse_linear"]
-    start: float
-    end: float
-    steps: int
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+
+import delisting_recos
+from delisting_recos import DAY_MS
+from delisting_recos import CandleStore
+from delisting_recos import CatLabel
+from delisting_recos import Coin
+from delisting_recos import CutoffSpec
+from delisting_recos import ExchangeName
+from delisting_recos import HttpCache
+from delisting_recos import HttpRequest
+from delisting_recos import MarketCache
+from delisting_recos import ScoreConfig
+from delisting_recos import StageCache
+from delisting_recos import SpotFut
+from delisting_recos import Symbol
+from delisting_recos import SymbolNormalizer
+from delisting_recos import ThresholdScorer
+from delisting_recos import Tracer
+from delisting_recos import TokenBucket
+from delisting_recos import best_per_group
+from delisting_recos import compact_frame
+from delisting_recos import compile_cutoffs
+from delisting_recos import candle_grid
+from delisting_recos import candle_metrics
+from delisting_recos import download_markets
+from delisting_recos import fetch_json_all
+from delisting_recos import make_session
+from delisting_recos import recommend
+from delisting_recos import recommendation_codes
+from delisting_recos import select_liquid_markets
+from delisting_recos import top_k_geomean
+from delisting_recos import top_k_per_group
+from delisting_recos import score_delta
+from delisting_recos import sweep
+from delisting_recos import tier_bounds
+from delisting_recos import to_columnar
+from delisting_recos import window_stats
+from delisting_recos import write_compressed
+from delisting_recos import write_manifest
+from delisting_recos import write_shards
 
 
 ### Constants
@@ -186,6 +214,52 @@ for k, v in SCORE_CUTOFFS.items():
     OUTPUT_COLS.append(k)
     OUTPUT_COLS.extend(v)
 
+SCORER = ThresholdScorer(SCORE_CUTOFFS)
+
+# the site's inputs, each also written as .gz and, with brotli, .br: a
+# summary index of every coin, its figure, and the remaining columns split
+# into shards that the page loads as rows are expanded
+OUTPUT_JSON: str = "hl_delisting_data.json"
+FIGURE_JSON: str = "hl_delisting_fig.json"
+SHARD_DIR: str = "hl_delisting_shards"
+SHARD_COUNT: int = 16
+MANIFEST_JSON: str = "hl_delisting_manifest.json"
+SUMMARY_COLS: list[str] = [
+    "Symbol",
+    "Max Lev. on HL",
+    "Recommendation",
+    "Score",
+    *SCORE_CUTOFFS,
+    # shown by default on the page, so they load without any shard
+    "MC $m",
+    "Spot Volume $m",
+    "Fut Volume $m",
+]
+# coins added, removed, recommended differently, or whose score moved by at
+# least DELTA_SCORE_THRESHOLD points since the last run that differed
+DELTA_JSON: str = "hl_delisting_delta.json"
+DELTA_SCORE_THRESHOLD: float = 5
+
+# dtypes of the merged frame, whose other float columns become float32;
+# Hyperliquid sends its asset contexts as numeric strings. The scored
+# variables stay float64, as float32 shifts values across score cutoffs
+# and changes their published rounding
+MERGED_SCHEMA: dict[str, str] = {
+    "Symbol": "category",
+    "name": "category",
+    "funding": "float32",
+    "openInterest": "float32",
+    "prevDayPx": "float32",
+    "dayNtlVlm": "float32",
+    "premium": "float32",
+    "oraclePx": "float32",
+    "markPx": "float32",
+    "midPx": "float32",
+    "dayBaseVlm": "float32",
+    **{var: "float64" for specs in SCORE_CUTOFFS.values() for var in specs},
+}
+SCORE_DTYPE: str = "int8"
+
 
 HL_STRICT: set[Coin] = {
     "PURR",
@@ -203,193 +277,306 @@ HL_STRICT: set[Coin] = {
     "RAGE",
 }
 HL_STRICT_BOOST: float = 5
+# share of these scores coins not listed on HL get on top
+NON_HL_BOOST: float = 0.5
+NON_HL_BOOST_CATEGORIES: list[str] = [
+    "Market Cap Score",
+    "Spot Volume Score",
+    "Futures Volume Score",
+]
 DAYS_TO_CONSIDER: float = 30
-
-earliest_ts_to_keep: float = (
-    time.time() - (DAYS_TO_CONSIDER + 5) * 24 * 60 * 60
-)
+# trailing windows (days) of the extra liquidity metrics
+METRIC_WINDOWS: list[int] = [7, 30, 90]
 
 SCORE_UB: dict[int, float] = {0: 62, 3: 75, 5: 85, 10: 101}
 SCORE_LB: dict[int, float] = {0: 0, 3: 37, 5: 48, 10: 60}
 
+SCORE_CONFIG = ScoreConfig(
+    SCORE_CUTOFFS, SCORE_LB, SCORE_UB, HL_STRICT_BOOST, NON_HL_BOOST
+)
+
 MSR_INTERVAL: Literal["1d"] = "1d"
+MARKETS_CACHE_TTL: float = 24 * 60 * 60
+MAX_CANDLES: int = 1000
+# 24h quote volume below which a market is not worth downloading
+MIN_TICKER_VOLUME: float = 1_000
 
 
 def sig_figs(number: float, sig_figs: int = 3):
     if np.isnan(number) or number <= 0:
         return 0
+    # python numbers, so float32 columns print and serialize like float64
+    number = number.item() if isinstance(number, np.generic) else number
     return round(number, int(sig_figs - 1 - math.log10(number)))
 
 
-def clean_symbol(symbol: Symbol, exch: ExchangeName | Literal[""] = ""):
-    redone = symbol.split("/")[0]
-    for suffix in ["10000000", "1000000", "1000", "k"]:
-        redone = redone.replace(suffix, "")
-    redone = EXCH_TOKEN_ALIASES.get((redone, exch), redone)
-    return TOKEN_ALIASES.get(redone, redone)
+def sig_figs_text(values: pd.Series, figures: int = 3) -> pd.Series:
+    # str(sig_figs(x, figures)) of every value, each distinct one rounded once
+    unique = values.unique().tolist()
+    return values.map(
+        dict(zip(unique, (str(sig_figs(x, figures)) for x in unique)))
+    )
 
 
-def get_hot_ccxt_api(exch: ExchangeName) -> Exchange:
-    api = getattr(ccxt, exch)()
-    api.load_markets()
-    return api
+def earliest_ts_to_keep(as_of: float | None = None) -> float:
+    # unix time of the oldest candle considered as of `as_of`, default now
+    as_of = time.time() if as_of is None else as_of
+    return as_of - (DAYS_TO_CONSIDER + 5) * 24 * 60 * 60
 
 
-hl_markets: dict[Symbol, dict[str, Any]] = cast(
-    dict[Symbol, dict[str, Any]], get_hot_ccxt_api("hyperliquid").markets
+SYMBOLS = SymbolNormalizer(
+    ["10000000", "1000000", "1000", "k"], TOKEN_ALIASES, EXCH_TOKEN_ALIASES
 )
 
 
+def clean_symbol(symbol: Symbol, exch: ExchangeName | Literal[""] = ""):
+    return SYMBOLS(symbol, exch)
+
+
+MARKET_CACHE = MarketCache(ttl=MARKETS_CACHE_TTL)
+
+
 def print_message(message: str, level: int = 0) -> None:
     print("  " * level + message)
 
 
-# %% REFERENCE EXCHANGE DATA
-print_message("Building reference exchange data")
+# spans of this run, written to RUN_REPORT_JSON when it ends
+TRACER = Tracer()
+RUN_REPORT_JSON: str = "recos_run_report.json"
 
 
+# %% REFERENCE EXCHANGE DATA
 def get_fn(exch: ExchangeName, spot_fut: SpotFut) -> str:
-    return f"exch_candles_{exch}_{spot_fut}_{MSR_INTERVAL}.json"
+    # file stem of the columnar candle store, see CandleStore
+    return f"exch_candles_{exch}_{spot_fut}_{MSR_INTERVAL}"
 
 
-def download_one_exch(exch: ExchangeName, spot_fut: SpotFut) -> None:
-    fn = get_fn(exch, spot_fut)
-    try:
-        with open(fn) as f:
-            pass
-        print_message(f"Skipping {exch} {spot_fut} as downloaded", level=2)
+def is_wanted_market(market: Symbol, spot_fut: SpotFut) -> bool:
+    if spot_fut == "spot" and ":" in market:
+        return False
+    if spot_fut == "futures" and ":USD" not in market:
+        return False
+    return "/USD" in market and "-" not in market
 
-        return
-    except Exception:
-        print_message(f"Starting download of {exch} {spot_fut}", level=2)
 
-    api = get_hot_ccxt_api(exch)
+async def download_one_exch(
+    api: ccxt_async.Exchange, bucket: TokenBucket, spot_fut: SpotFut
+) -> None:
+    exch: ExchangeName = api.id
+    print_message(f"Starting download of {exch} {spot_fut}", level=2)
+    store = CandleStore.load(get_fn(exch, spot_fut), max_candles=MAX_CANDLES)
+
     if api.markets is None:
         raise RuntimeError(f"No markets found for exchange {exch}")
+    candidates = [m for m in api.markets if is_wanted_market(m, spot_fut)]
+    markets = await select_liquid_markets(
+        api,
+        bucket,
+        candidates,
+        coin_of=lambda market: clean_symbol(market, exch),
+        min_quote_volume=MIN_TICKER_VOLUME,
+    )
+    print_message(
+        f"Kept {len(markets)}/{len(candidates)} {exch} {spot_fut} markets",
+        level=3,
+    )
+    store.select(markets)
+    if store.completed:
+        print_message(
+            f"Resuming {exch} {spot_fut}, {len(store.completed)} markets done",
+            level=3,
+        )
 
-    exchange_data: dict[Symbol, list[list[float]]] = {}
-    for market in api.markets:
-        try:
-            if spot_fut == "spot" and ":" in market:
-                continue
-            if spot_fut == "futures" and ":USD" not in market:
-                continue
-            if "/USD" not in market:
-                continue
-            if "-" in market:
-                continue
-
-            print_message(f"Downloading {exch} {market}...", level=3)
-            exchange_data[market] = api.fetch_ohlcv(
-                market, MSR_INTERVAL, limit=1000
-            )
-            time.sleep(2)
-
-        except Exception as e:
-            print_message(f"Error downloading {exch} {market}: {e}", level=3)
-            time.sleep(5)
-
-    with open(fn, "w") as f:
-        json.dump(exchange_data, f)
-    print_message(f"Completed download of {exch} {spot_fut}", level=2)
+    errors = await download_markets(
+        api, bucket, store, markets, MSR_INTERVAL, limit=MAX_CANDLES
+    )
+    for market, e in errors.items():
+        print_message(f"Error downloading {exch} {market}: {e}", level=3)
+
+    store.save()
+    print_message(
+        f"Completed download of {exch} {spot_fut}"
+        f" ({len(markets) - len(errors)}/{len(markets)} markets)",
+        level=2,
+    )
 
 
-def dl_reference_exch_data() -> None:
-    with ThreadPoolExecutor(max_workers=100) as ex:
-        for exch, exch_spec in REFERENCE_EXCH.items():
-            for spot_fut in exch_spec:
-                _ = ex.submit(download_one_exch, exch, spot_fut)
+async def download_exch(exch: ExchangeName, exch_spec: list[SpotFut]) -> None:
+    with TRACER.span(exch):
+        await asyncio.to_thread(MARKET_CACHE.markets, exch)
+        # ccxt's own throttler is replaced by a bucket shared by spot and
+        # futures
+        api = TRACER.instrument_exchange(
+            MARKET_CACHE.async_api(exch, {"enableRateLimit": False})
+        )
+        try:
+            bucket = TokenBucket.for_api(api)
+            await asyncio.gather(
+                *(
+                    download_one_exch(api, bucket, spot_fut)
+                    for spot_fut in exch_spec
+                )
+            )
+        finally:
+            await api.close()
+
+
+async def dl_reference_exch_data() -> None:
+    with TRACER.span("exchanges"):
+        results = await asyncio.gather(
+            *(
+                download_exch(exch, exch_spec)
+                for exch, exch_spec in REFERENCE_EXCH.items()
+            ),
+            return_exceptions=True,
+        )
+    for exch, result in zip(REFERENCE_EXCH, results):
+        if isinstance(result, Exception):
+            print_message(f"Error downloading {exch}: {result}", level=2)
+
+
+def get_contract_sizes(
+    markets: dict[Symbol, dict[str, Any]], symbols: list[Symbol]
+) -> np.ndarray:
+    # ccxt contract size of each market, capped at and defaulting to 1
+    return np.array(
+        [
+            min(markets.get(sym, {}).get("contractSize", None) or 1, 1)
+            for sym in symbols
+        ]
+    )
 
 
-print_message(
-    "Downloading reference exchange data concurrently using CCXT", level=1
-)
-dl_reference_exch_data()
+def coin_exchange_tensors(
+    parts: dict[SpotFut, list[tuple[int, np.ndarray, np.ndarray]]],
+    dtype: Any = np.float64,
+) -> tuple[list[Coin], dict[SpotFut, np.ndarray]]:
+    # scatters the (metric, coin, day) arrays of each exchange index into a
+    # nan-filled (metric, coin, exchange, day) tensor per spot/futures, over
+    # the sorted coins of all of them
+    all_coins = sorted(
+        {coin for p in parts.values() for _, coins, _ in p for coin in coins}
+    )
+    coin_pos = {coin: i for i, coin in enumerate(all_coins)}
+    tensors: dict[SpotFut, np.ndarray] = {}
+    for spot_fut, exch_parts in parts.items():
+        n_metrics, _, n_days = exch_parts[0][2].shape
+        tensors[spot_fut] = np.full(
+            (n_metrics, len(all_coins), len(REFERENCE_EXCH), n_days),
+            np.nan,
+            dtype=dtype,
+        )
+        for e, coins, values in exch_parts:
+            tensors[spot_fut][:, [coin_pos[c] for c in coins], e] = values
+    return all_coins, tensors
 
 
-def geomean_three(series: pd.Series) -> float:
-    return np.exp(np.log(series + 1).sort_values()[-3:].sum() / 3) - 1
+def summarize_exch_candles(
+    candles: pd.DataFrame,
+    markets: dict[Symbol, dict[str, Any]],
+    exch: ExchangeName,
+) -> pd.DataFrame:
+    days = int(DAYS_TO_CONSIDER)
+    # the markets' download order, which breaks volume ties below
+    candles = candles.assign(
+        order=candles.groupby(
+            ["spot_fut", "symbol"], observed=True, sort=False
+        ).ngroup()
+    )
+    candles = candles.loc[candles.t >= earliest_ts_to_keep() * 1000]
+    candles = candles.sort_values(["spot_fut", "symbol", "t"])
+    keys = [candles.spot_fut, candles.symbol]
+
+    # 1 is the last closed candle, 0 the one still open
+    from_end = candles.groupby(keys, observed=True).cumcount(ascending=False)
+    window = candles.loc[from_end.between(1, days)]
+    from_end = from_end.loc[window.index]
+    keys = [window.spot_fut, window.symbol]
+    by_symbol = window.groupby(keys, observed=True, sort=False)
+
+    last_close = by_symbol.c.transform("last")
+    returns = window.c / by_symbol.c.shift() - 1
+    ranges = window.h / window.l - 1
+    last_two = from_end <= 2
+    last_two_keys = [k.loc[last_two] for k in keys]
+
+    summary = pd.DataFrame(
+        {
+            "volume": (np.minimum(window.l, last_close) * window.v)
+            .groupby(keys, observed=True)
+            .mean(),
+            "std": returns.loc[last_two]
+            .groupby(last_two_keys, observed=True)
+            .std(),
+            "intra_day_range": ranges.loc[last_two]
+            .groupby(last_two_keys, observed=True)
+            .std(),
+            "order": window.order.groupby(keys, observed=True).first(),
+        }
+    )
+    summary.index.names = ["spot_fut", "symbol"]
+    symbols = summary.index.get_level_values("symbol")
+    summary["volume"] *= get_contract_sizes(markets, list(symbols)) / 1e6
+    summary["coin"] = SYMBOLS.normalize_many(symbols, exch)
+
+    # max volume market per coin, the later downloaded market winning ties
+    summary = summary.loc[summary.volume >= 0].sort_values(
+        "order", ascending=False
+    )
+    best = summary.reset_index().groupby(["spot_fut", "coin"]).volume.idxmax()
+    output_df = summary.reset_index().loc[best.values]
+    output_df.insert(0, "exch", exch)
+    return output_df.set_index(["exch", "spot_fut", "coin"])[
+        ["volume", "std", "intra_day_range"]
+    ]
 
 
 def process_reference_exch_data() -> pd.DataFrame:
-    all_candle_data: dict[
-        tuple[ExchangeName, SpotFut, Coin], dict[str, float]
-    ] = {}
+    exch_summaries: list[pd.DataFrame] = []
 
     for exch, exch_spec in REFERENCE_EXCH.items():
         print_message(f"Processing {exch}", level=2)
-        api = get_hot_ccxt_api(exch)
-        if api.markets is None:
-            raise RuntimeError(f"No markets found for exchange {exch}")
-
-        for spot_fut in exch_spec:
-            with open(get_fn(exch, spot_fut)) as f:
-                exch_data = json.load(f)
-
-            for symbol, market in exch_data.items():
-                coin = clean_symbol(symbol, exch)
-                if not len(market):
-                    continue
-                market_df = (
-                    pd.DataFrame(market, columns=[*"tohlcv"])
-                    .set_index("t")
-                    .sort_index()
-                    .loc[earliest_ts_to_keep * 1000 :]
-                    .iloc[-DAYS_TO_CONSIDER - 1 : -1]
+        with TRACER.span(exch) as span:
+            candles = []
+            for spot_fut in exch_spec:
+                store = CandleStore.load(get_fn(exch, spot_fut))
+                symbols = store.selected
+                candles.append(
+                    store.to_frame(symbols).assign(spot_fut=spot_fut)
                 )
-                if not len(market_df):
-                    continue
-                contractsize = min(
-                    api.markets.get(symbol, {}).get("contractSize", None) or 1,
-                    1,
+                print_message(
+                    f"Loaded {len(symbols)} symbols for {exch} {spot_fut}",
+                    level=3,
                 )
-                my_val = (
-                    (
-                        np.minimum(market_df.l, market_df.c.iloc[-1])
-                        * market_df.v
-                    ).mean()
-                    * contractsize
-                    / 1e6
+            exch_candles = pd.concat(candles, ignore_index=True)
+            exch_summaries.append(
+                summarize_exch_candles(
+                    exch_candles, MARKET_CACHE.markets(exch), exch
                 )
-                if my_val >= all_candle_data.get(
-                    (exch, spot_fut, coin), {}
-                ).get("volume", 0):
-                    all_candle_data[exch, spot_fut, coin] = {
-                        "volume": my_val,
-                        "std": (market_df.c / market_df.c.shift() - 1)
-                        .iloc[-2:]
-                        .dropna()
-                        .std(),
-                        "intra_day_range": (market_df.h / market_df.l - 1)
-                        .iloc[-2:]
-                        .dropna()
-                        .std(),
-                    }
-            print_message(
-                f"Loaded {len(exch_data)} symbols for {exch} {spot_fut}",
-                level=3,
             )
+            span.record_rows(exch_candles, exch_summaries[-1])
 
-    df_coins = pd.DataFrame(all_candle_data).T.sort_values(
+    df_coins = pd.concat(exch_summaries).sort_values(
         by="volume", ascending=False
     )
-    df_coins.index.names = ["exch", "spot_fut", "coin"]
-    output_df: pd.DataFrame = cast(
-        pd.DataFrame,
-        (
-            (df_coins.fillna(0))
-            .groupby(["spot_fut", "coin"])
-            .agg(
-                {
-                    "volume": [geomean_three, "sum"],
-                    "std": "median",
-                    "intra_day_range": "median",
-                }
-            )
-            .unstack(0)
-            .fillna(0)
+    df_coins = df_coins.fillna(0)
+    by_coin = df_coins.groupby(["spot_fut", "coin"])
+    output_df = by_coin.agg(
+        {"volume": "sum", "std": "median", "intra_day_range": "median"}
+    )
+    output_df.columns = pd.MultiIndex.from_tuples(
+        [("volume", "sum"), ("std", "median"), ("intra_day_range", "median")]
+    )
+    output_df.insert(
+        0,
+        ("volume", "geomean_three"),
+        top_k_geomean(
+            df_coins.volume.to_numpy(),
+            by_coin.ngroup().to_numpy(),
+            len(output_df),
         ),
     )
+    output_df = output_df.unstack(0).fillna(0)
     output_df.columns = [
         {"spot": "Spot", "futures": "Fut"}[spot_fut]
         + " "
@@ -408,28 +595,142 @@ def process_reference_exch_data() -> pd.DataFrame:
     return output_df
 
 
-print_message("Processing reference exchange data", level=1)
-proc_ref_data = process_reference_exch_data()
+def process_reference_exch_windows() -> pd.DataFrame:
+    # per coin, the METRIC_WINDOWS volume, realized volatility and intraday
+    # range on each exchange's most traded market, from a dense float32
+    # (metric, coin, exchange, day) tensor ending with today's open candle
+    n_days = max(METRIC_WINDOWS) + 1
+    first_day = (int(time.time() * 1000) // DAY_MS - n_days + 1) * DAY_MS
+    parts: dict[SpotFut, list[tuple[int, np.ndarray, np.ndarray]]] = {}
+
+    for e, (exch, exch_spec) in enumerate(REFERENCE_EXCH.items()):
+        markets = MARKET_CACHE.markets(exch)
+        for spot_fut in exch_spec:
+            store = CandleStore.load(get_fn(exch, spot_fut))
+            candles = store.to_frame(store.selected)
+            symbols = list(candles.symbol.cat.categories)
+            if not symbols:
+                continue
+            _, high, low, close, volume = candle_grid(
+                candles, first_day, n_days
+            )
+            contract_sizes = get_contract_sizes(markets, symbols)
+            last_close = close[:, -2:-1]
+            daily = np.stack(
+                [
+                    np.minimum(low, last_close)
+                    * volume
+                    * contract_sizes[:, None]
+                    / 1e6,
+                    np.log(close / np.roll(close, 1, axis=1)),
+                    high / low - 1,
+                ]
+            )
+            daily[1, :, 0] = np.nan
+
+            coins, rows = best_per_group(
+                np.nansum(daily[0], axis=1, keepdims=True),
+                np.array(SYMBOLS.normalize_many(symbols, exch)),
+            )
+            found = rows[:, 0] >= 0
+            parts.setdefault(spot_fut, []).append(
+                (e, coins[found], daily[:, rows[found, 0]])
+            )
+
+    all_coins, tensors = coin_exchange_tensors(parts, np.float32)
+    columns: dict[str, np.ndarray] = {}
+    for spot_fut, tensor in sorted(tensors.items()):
+        label = {"spot": "Spot", "futures": "Fut"}[spot_fut]
+        with warnings.catch_warnings():
+            # coins not traded on any exchange
+            warnings.simplefilter("ignore", RuntimeWarning)
+            for window, (volume, std, ranges) in window_stats(
+                tensor, METRIC_WINDOWS
+            ).items():
+                columns |= {
+                    f"{label} Volume {window}d $m": np.nansum(volume, axis=1),
+                    f"{label} Volatility {window}d (std)": np.nanmedian(
+                        std, axis=1
+                    ),
+                    f"{label} Intraday range {window}d": np.nanmedian(
+                        ranges, axis=1
+                    ),
+                }
 
+    return pd.DataFrame(columns, index=all_coins).fillna(0)
 
-# %%
-print_message("Building Hyperliquid API sourced data")
 
+# %% API DATA
+HL_INFO_URL: str = "https://api.hyperliquid.xyz/info"
+THUNDERHEAD_URL: str = "https://d2v1fiwobg9w6.cloudfront.net"
+THUNDERHEAD_QUERIES: set[str] = {
+    "daily_usd_volume_by_coin",
+    "total_volume",
+    "asset_ctxs",
+    "hlp_positions",
+    "liquidity_by_coin",
+}
+CMC_API_URL: str = (
+    "https://pro-api.coinmarketcap.com/v1/cryptocurrency/listings/latest"
+)
+# seconds a response is reused before being revalidated upstream
+HL_TTL: float = 5 * 60
+THUNDERHEAD_TTL: float = 6 * 60 * 60
+CMC_TTL: float = 60 * 60
 
-def dl_hl_data():
-    response = requests.post(
-        "https://api.hyperliquid.xyz/info",
-        headers={"Content-Type": "application/json"},
-        json={"type": "metaAndAssetCtxs"},
-    )
-    response.raise_for_status()
-    return response.json()
+HTTP_CACHE = HttpCache()
+
+
+def dl_api_data() -> dict[str, Any]:
+    import keyring  # for cmc api key
 
+    with TRACER.span("api"):
+        responses = fetch_json_all(
+            TRACER.instrument_session(make_session()),
+            {
+                "hl": HttpRequest(
+                    "POST",
+                    HL_INFO_URL,
+                    body={"type": "metaAndAssetCtxs"},
+                    ttl=HL_TTL,
+                ),
+                **{
+                    query: HttpRequest(
+                        "GET",
+                        f"{THUNDERHEAD_URL}/{query}",
+                        headers={"accept": "*/*"},
+                        ttl=THUNDERHEAD_TTL,
+                    )
+                    for query in THUNDERHEAD_QUERIES
+                },
+                "cmc": HttpRequest(
+                    "GET",
+                    CMC_API_URL,
+                    params={
+                        "CMC_PRO_API_KEY": keyring.get_password("cmc", "cmc"),
+                        "limit": 5000,
+                    },
+                    ttl=CMC_TTL,
+                ),
+            },
+            cache=HTTP_CACHE,
+        )
+
+    cmc_data: list[dict[str, Any]] = responses["cmc"].get("data", [])
+    for item in cmc_data:
+        item["symbol"] = TOKEN_ALIASES.get(item["name"], item["symbol"])
 
-print_message("Downloading Hyperliquid API sourced data", level=1)
-raw_hl_data: list[dict[str, Any]] = dl_hl_data()
+    return {
+        "hl": responses["hl"],
+        "thunderhead": {
+            query: responses[query].get("chart_data", [])
+            for query in THUNDERHEAD_QUERIES
+        },
+        "cmc": cmc_data,
+    }
 
 
+# %% HYPERLIQUID API DATA
 def process_hl_data(raw_hl_data: list[dict[str, Any]]) -> pd.DataFrame:
     universe, asset_ctxs = raw_hl_data[0]["universe"], raw_hl_data[1]
     merged_data = [u | a for u, a in zip(universe, asset_ctxs)]
@@ -442,45 +743,14 @@ def process_hl_data(raw_hl_data: list[dict[str, Any]]) -> pd.DataFrame:
     return output_df
 
 
-print_message("Processing Hyperliquid API sourced data", level=1)
-proc_hl_data: pd.DataFrame = process_hl_data(raw_hl_data)
-
-
-# %%
-print_message("Building Thunderhead API sourced data")
-
-
-def dl_thunderhead_data() -> dict[str, list[dict[str, Any]]]:
-    THUNDERHEAD_URL = "https://d2v1fiwobg9w6.cloudfront.net"
-    THUNDERHEAD_HEADERS: dict[str, str] = {"accept": "*/*"}
-
-    THUNDERHEAD_QUERIES: set[str] = {
-        "daily_usd_volume_by_coin",
-        "total_volume",
-        "asset_ctxs",
-        "hlp_positions",
-        "liquidity_by_coin",
-    }
-
-    raw_thunder_data: dict[str, list[dict[str, Any]]] = {}
-    for query in THUNDERHEAD_QUERIES:
-        response = requests.get(
-            f"{THUNDERHEAD_URL}/{query}",
-            headers=THUNDERHEAD_HEADERS,
-            allow_redirects=True,
-        )
-        response.raise_for_status()
-        raw_thunder_data[query] = response.json().get("chart_data", [])
-    return raw_thunder_data
-
-
-print_message("Downloading Thunderhead API sourced data", level=1)
-raw_thunder_data: dict[str, list[dict[str, Any]]] = dl_thunderhead_data()
+# %% THUNDERHEAD API DATA
+THUNDERHEAD_DAYS: int = 30
 
 
-def process_thunderhead_data(
+def thunderhead_history(
     raw_thunder_data: dict[str, list[dict[str, Any]]]
 ) -> pd.DataFrame:
+    # one row per day, one (metric, coin) column each
     dfs: list[pd.DataFrame] = []
 
     for key, records in raw_thunder_data.items():
@@ -511,12 +781,15 @@ def process_thunderhead_data(
     fut_data_df["avg_notional_oi"] = (
         fut_data_df["avg_oracle_px"] * fut_data_df["avg_open_interest"]
     )
-    output_df: pd.DataFrame = (
-        fut_data_df.unstack(1).sort_index().iloc[-30:].mean().unstack(0)
+    history = fut_data_df.unstack(1).sort_index()
+    coins = history.columns.levels[1]
+    return history.rename(
+        columns=dict(zip(coins, SYMBOLS.normalize_many(coins))), level=1
     )
 
-    output_df.index = pd.Index([clean_symbol(sym) for sym in output_df.index])
 
+def summarize_thunderhead(output_df: pd.DataFrame) -> pd.DataFrame:
+    # daily metrics averaged per coin, or per (day, coin) for backtests
     output_df["HLP Vol Share %"] = (
         (output_df["total_volume"] - output_df["daily_usd_volume"] / 2)
         / output_df["total_volume"]
@@ -540,52 +813,29 @@ def process_thunderhead_data(
     return output_df.dropna(subset="time")
 
 
-print_message("Processing Thunderhead API sourced data", level=1)
-proc_thunderhead_data: pd.DataFrame = process_thunderhead_data(
-    raw_thunder_data
-)
-
-
-# %%
-print_message("Building CoinMarketCap API sourced data")
-
-
-def dl_cmc_data() -> list[dict[str, Any]]:
-    import keyring  # for cmc api key
-
-    CMC_API_URL = (
-        "https://pro-api.coinmarketcap.com/v1/cryptocurrency/listings/latest"
+def process_thunderhead_data(
+    raw_thunder_data: dict[str, list[dict[str, Any]]]
+) -> pd.DataFrame:
+    history = thunderhead_history(raw_thunder_data)
+    return summarize_thunderhead(
+        history.iloc[-THUNDERHEAD_DAYS:].mean().unstack(0)
     )
-    CMC_API_KEY = keyring.get_password("cmc", "cmc")
-
-    response = requests.get(
-        f"{CMC_API_URL}?CMC_PRO_API_KEY={CMC_API_KEY}&limit=5000", timeout=10
-    )
-    response.raise_for_status()
-    data: list[dict[str, Any]] = response.json().get("data", [])
-
-    for item in data:
-        item["symbol"] = TOKEN_ALIASES.get(item["name"], item["symbol"])
-
-    return data
-
-
-print_message("Downloading CoinMarketCap API sourced data", level=1)
-raw_cmc_data: list[dict[str, Any]] = dl_cmc_data()
 
 
+# %% COINMARKETCAP API DATA
 def process_cmc_data(cmc_data: list[dict[str, Any]]) -> pd.DataFrame:
+    symbols = SYMBOLS.normalize_many(a["symbol"] for a in cmc_data)
     output_df: pd.DataFrame = (
         pd.DataFrame(
             [
                 {
-                    "symbol": clean_symbol(a["symbol"]),
+                    "symbol": symbol,
                     "mc": float(a["quote"]["USD"]["market_cap"]),
                     "fd_mc": float(
                         a["quote"]["USD"]["fully_diluted_market_cap"]
                     ),
                 }
-                for a in cmc_data
+                for a, symbol in zip(cmc_data, symbols)
             ]
         )
         .groupby("symbol")[
@@ -603,66 +853,21 @@ def process_cmc_data(cmc_data: list[dict[str, Any]]) -> pd.DataFrame:
     return output_df
 
 
-print_message("Processing CoinMarketCap API sourced data", level=1)
-proc_cmc_data: pd.DataFrame = process_cmc_data(raw_cmc_data)
-
-
-# %%
+# %% SCORING
 def build_scores(df: pd.DataFrame) -> pd.DataFrame:
-    output: dict[str, pd.Series] = {}
-    for score_category, category_details in SCORE_CUTOFFS.items():
-        output[score_category] = pd.Series(0, index=df.index)
-        for score_var, thresholds in category_details.items():
-            score_name = "Partial_Score_" + score_var
-            output[score_name] = pd.Series(0, index=df.index)
-
-            if thresholds["kind"] == "exp":
-                point_thresholds = {
-                    thresholds["start"]
-                    * (thresholds["end"] / thresholds["start"])
-                    ** (k / thresholds["steps"]): k
-                    for k in range(0, thresholds["steps"] + 1)
-                }
-                for lb, value in sorted(point_thresholds.items()):
-                    output[score_name].loc[df[score_var] >= lb] = value
-            elif thresholds["kind"] == "linear":
-                point_thresholds = {
-                    thresholds["start"]
-                    + (thresholds["end"] - thresholds["start"])
-                    * (k / thresholds["steps"]): k
-                    for k in range(0, thresholds["steps"] + 1)
-                }
-                for lb, value in sorted(point_thresholds.items()):
-                    output[score_name].loc[df[score_var] >= lb] = value
-
-            elif thresholds["kind"] == "reverse_linear":
-                point_thresholds = {
-                    thresholds["start"]
-                    + (thresholds["end"] - thresholds["start"])
-                    * (k / thresholds["steps"]): k
-                    for k in range(0, thresholds["steps"] + 1)
-                }
-                for lb, value in reversed(sorted(point_thresholds.items())):
-                    output[score_name].loc[df[score_var] <= lb] = value
-
-            else:
-                raise ValueError("thresholds['kind']")
-
-            output[score_category] += output[score_name]
-
-    output_df = pd.concat(output, axis=1)
+    output_df = SCORER.score(df).astype(SCORE_DTYPE)
     output_df.loc[
         df["Max Lev. on HL"] < 1, [c for c in output_df if "HL" in str(c)]
     ] = 0
     output_df["NON_HL_SCORE_BOOST"] = (
-        0.5
+        NON_HL_BOOST
         * (df["Max Lev. on HL"] < 1)
-        * output_df[
-            ["Market Cap Score", "Spot Volume Score", "Futures Volume Score"]
-        ].sum(axis=1)
-    ).astype(int)
+        * output_df[NON_HL_BOOST_CATEGORIES].sum(axis=1)
+    ).astype(SCORE_DTYPE)
 
-    output_df["Strict"] = output_df.index.isin(HL_STRICT)
+    output_df["Strict"] = output_df.index.get_level_values(-1).isin(
+        HL_STRICT
+    )
     output_df["Score"] = (
         output_df[[*SCORE_CUTOFFS, "NON_HL_SCORE_BOOST"]].sum(axis=1)
         + output_df["Strict"] * HL_STRICT_BOOST
@@ -671,63 +876,32 @@ def build_scores(df: pd.DataFrame) -> pd.DataFrame:
     return output_df
 
 
-print_message("Building recommendations", level=0)
-print_message("Merging data", level=1)
-processed_data: list[pd.DataFrame] = [
-    proc_cmc_data,
-    proc_ref_data,
-    proc_hl_data,
-    proc_thunderhead_data,
-]
-df: pd.DataFrame = pd.concat(processed_data, axis=1)
-df = df.loc[~df.index.isin(STABLE_COINS)]
-
-df["Symbol"] = df.index
-df["Max Lev. on HL"] = df["Max Lev. on HL"].fillna(0)
-
-df = pd.concat([df, build_scores(df)], axis=1)
+def generate_recommendations(df: pd.DataFrame) -> pd.Categorical:
+    return recommend(df["Score"], df["Max Lev. on HL"], SCORE_LB, SCORE_UB)
 
 
-def generate_recommendation(row: pd.Series) -> str:
-    high_lev = (
-        row["Score"] < SCORE_LB[min(max(SCORE_LB), int(row["Max Lev. on HL"]))]
-    )
-    low_lev = (
-        row["Score"]
-        >= SCORE_UB[min(max(SCORE_UB), int(row["Max Lev. on HL"]))]
+def sweep_score_configs(
+    configs: list[ScoreConfig],
+    cache_dir: str = ".recos_cache",
+    processes: int | None = None,
+) -> pd.DataFrame:
+    """Recommendation flips vs SCORE_CONFIG under each candidate config.
+
+    Rescores the merged frame cached by the last run, so nothing is
+    downloaded. Vary SCORE_CONFIG with dataclasses.replace.
+    """
+    return sweep(
+        StageCache(cache_dir).load("merge"),
+        configs,
+        SCORE_CONFIG,
+        HL_STRICT,
+        NON_HL_BOOST_CATEGORIES,
+        processes=processes,
     )
 
-    if row["Max Lev. on HL"] > 3 and high_lev:
-        return "Dec. Lev."
-    if row["Max Lev. on HL"] == 3 and high_lev:
-        return "Delist"
-    if row["Max Lev. on HL"] == 0 and low_lev:
-        return "List"
-    if row["Max Lev. on HL"] > 0 and low_lev:
-        return "Inc. Lev."
-    return ""
-
-
-print_message("Generating recommendations", level=1)
-df["Recommendation"] = df.apply(generate_recommendation, axis=1)
-
-df_for_main_data = df[OUTPUT_COLS].sort_values("Score", ascending=False).copy()
-
-for c in df_for_main_data.columns:
-    if str(df_for_main_data[c].dtype) in [
-        "int64",
-        "float64",
-    ]:
-        df_for_main_data[c] = df_for_main_data[c].map(sig_figs)
 
-
-# %%
-
-
-import plotly.express as px
-import pandas as pd
-
-lev_map = {
+# %% RENDERING
+LEV_MAP: dict[int, str] = {
     0: "Not listed",
     3: "3x",
     5: "5x",
@@ -736,153 +910,653 @@ lev_map = {
     25: "20x+",
     40: "20x+",
 }
-lev_list = list(lev_map.values())
 
-# Map each "Max Lev. on HL " value to its index in lev_list
-df2 = df.copy()
-df2["x_bucket"] = df2["Max Lev. on HL"].map(lev_map)
-df2["x_index"] = df2["x_bucket"].apply(
-    lambda v: lev_list.index(v) if v in lev_list else None
-)
-df2["show"] = df2.index
-df2["coin"] = df2.index
-
-df2["offset_o"] = 0
-df2["max_offset_o"] = 0
-
-for _, group in df2.groupby(["x_index", "Score"], sort=False):
-    df2.loc[group.index, "offset_o"] = range(len(group))
-    df2.loc[group.index, "max_offset_o"] = len(group)
-
-for _, group in df2.groupby(["x_index"], sort=False):
-    score_orders = group.Score.sort_values()
-    if len(score_orders) > 10:
-        scores_to_hide = score_orders.loc[
-            score_orders.gt(score_orders.iloc[5])
-            & score_orders.lt(score_orders.iloc[-5])
-        ]
 
-        df2.loc[scores_to_hide.index, "show"] = ""
+def render_outputs(df: pd.DataFrame, show: bool = True) -> None:
+    df_for_main_data = (
+        df[OUTPUT_COLS].sort_values("Score", ascending=False).copy()
+    )
 
-df2 = df2.loc[df2.Score.gt(55) | df2.x_index.gt(0)]
-df2["x_offset"] = (
-    df2["x_index"]
-    + (0.5 + df2.offset_o % 5 - np.minimum(df2.max_offset_o, 5) / 2) / 6
-)
-df2["y_offset"] = df2["Score"] + df2.offset_o // 5 / 2
-
-# Create scatter plot
-fig = px.scatter(
-    df2,
-    x="x_offset",
-    y="y_offset",
-    text=df2.show,
-    labels={"x_index": "Leverage Index", "y_offset": "Score"},
-    title="Score vs. Max Leverage Index on HL",
-    hover_name=df2.index,
-    template="plotly_dark",  # <--- dark mode template
-)
+    for c in df_for_main_data.columns:
+        dtype = df_for_main_data[c].dtype
+        if pd.api.types.is_numeric_dtype(
+            dtype
+        ) and not pd.api.types.is_bool_dtype(dtype):
+            df_for_main_data[c] = df_for_main_data[c].map(sig_figs)
+
+    with TRACER.span("figure"):
+        fig = build_figure(df)
+    if show:
+        fig.show(renderer="browser")
+    meta = {
+        "time": datetime.datetime.now().isoformat()[:10],
+        "version": 1.1,
+    }
+    details = [c for c in OUTPUT_COLS if c not in SUMMARY_COLS]
+    shards = write_shards(
+        df_for_main_data[["Symbol", *details]],
+        SHARD_DIR,
+        "Symbol",
+        SHARD_COUNT,
+    )
+    summary = df_for_main_data[SUMMARY_COLS].assign(Shard=shards)
+    data = to_columnar(summary, meta, dictionary=["Recommendation", "Shard"])
+    write_compressed(OUTPUT_JSON, json.dumps(data, separators=(",", ":")))
+    # the figure is serialized once, by plotly's fastest engine (orjson when
+    # installed), into its own file so the table does not wait for it
+    write_compressed(FIGURE_JSON, pio.to_json(fig, validate=False))
+    write_manifest(
+        MANIFEST_JSON,
+        [OUTPUT_JSON, FIGURE_JSON, *sorted(set(shards))],
+        SHARD_DIR,
+    )
 
 
-def make_hover_template(item):
-    z = f"<b> {item['coin']}</b><br>"
-    if item["Max Lev. on HL"] == 0:
-        z += "Not listed on Hyperliquid<br>"
+def publish_delta(df: pd.DataFrame, cache_dir: str) -> pd.DataFrame | None:
+    # the scores of the last two differing runs are kept, so rebuilding on
+    # the same data does not wipe out the delta to the run before
+    latest_fn = os.path.join(cache_dir, "scores.latest.pkl")
+    previous_fn = os.path.join(cache_dir, "scores.previous.pkl")
+    scores = df[["Recommendation", "Score"]].copy()
+    scores.attrs["time"] = datetime.datetime.now().isoformat()[:10]
+    latest = pd.read_pickle(latest_fn) if os.path.exists(latest_fn) else None
+    if latest is None or not latest.equals(scores):
+        if latest is not None:
+            os.replace(latest_fn, previous_fn)
+        scores.to_pickle(latest_fn)
     else:
-        z += f"Current HL Leverage Limit: {item['Max Lev. on HL']}<br>"
-    z += f"Score: {item['Score']}<br>"
-    for k, v in SCORE_CUTOFFS.items():
-        z += f"{k}: {item[k]}<br>"
-        for v1 in v:
-            z += f" {v1}: {sig_figs(item[v1],3)}<br>"
-    return z
+        scores = latest
+    if not os.path.exists(previous_fn):
+        print_message("No previous run to compare with", level=1)
+        return None
+
+    previous = pd.read_pickle(previous_fn)
+    delta = score_delta(previous, scores, DELTA_SCORE_THRESHOLD)
+    meta = {
+        "time": scores.attrs["time"],
+        "previous": previous.attrs["time"],
+        "score_threshold": DELTA_SCORE_THRESHOLD,
+    }
+    data = to_columnar(
+        delta.rename_axis("Symbol").reset_index(),
+        meta,
+        dictionary=["change", "Recommendation before", "Recommendation after"],
+    )
+    write_compressed(DELTA_JSON, json.dumps(data, separators=(",", ":")))
+    print_message(
+        f"{len(delta)} coins changed since {previous.attrs['time']}", level=1
+    )
+    return delta
 
 
-fig.update_traces(
-    mode="markers+text",
-    textfont=dict(size=8),
-    hovertemplate=[make_hover_template(a) for n, a in df2.iterrows()],
-    marker=dict(size=8, opacity=0.75),
-    textposition="middle center",
-)
+def build_figure(df: pd.DataFrame) -> go.Figure:
+    lev_map = LEV_MAP
+    lev_list = list(lev_map.values())
 
-fig.update_layout(
-    xaxis=dict(
-        tickvals=list(range(len(lev_list[:4]))),
-        ticktext=[str(x) for x in lev_list],
-        title="Max Leverage on Hyperliquid",
+    # Map each "Max Lev. on HL " value to its index in lev_list
+    plotted = [
+        "Max Lev. on HL",
+        "Score",
+        *SCORE_CUTOFFS,
+        *(v for variables in SCORE_CUTOFFS.values() for v in variables),
+    ]
+    # only the plotted columns are copied, with plain string coin labels
+    df2 = df[plotted].set_axis(df.index.astype(str))
+    df2["x_bucket"] = df2["Max Lev. on HL"].map(lev_map)
+    # first position of every bucket label, so all "20x+" levels share one
+    x_of_bucket = {label: lev_list.index(label) for label in lev_list}
+    df2["x_index"] = df2["x_bucket"].map(x_of_bucket)
+    df2["show"] = df2.index
+    df2["coin"] = df2.index
+
+    # markers of equal score in one bucket are laid out left to right in
+    # rows of five, in frame order
+    same_spot = df2.groupby(["x_index", "Score"], sort=False)
+    df2["offset_o"] = same_spot.cumcount().fillna(0).astype(int)
+    df2["max_offset_o"] = (
+        same_spot.Score.transform("size").fillna(0).astype(int)
+    )
+
+    # in crowded buckets only the labels of the lowest six and highest five
+    # scores stay, along with every coin tied with them
+    by_bucket = df2.groupby("x_index", sort=False).Score
+    rank = by_bucket.rank(method="first")
+    size = by_bucket.transform("size")
+    sixth_lowest = df2.Score[rank == 6].groupby(df2.x_index).max()
+    fifth_highest = df2.Score[rank == size - 4].groupby(df2.x_index).max()
+    hidden = (
+        size.gt(10)
+        & df2.Score.gt(df2.x_index.map(sixth_lowest))
+        & df2.Score.lt(df2.x_index.map(fifth_highest))
+    )
+    df2.loc[hidden, "show"] = ""
+
+    df2 = df2.loc[df2.Score.gt(55) | df2.x_index.gt(0)]
+    df2["x_offset"] = (
+        df2["x_index"]
+        + (0.5 + df2.offset_o % 5 - np.minimum(df2.max_offset_o, 5) / 2) / 6
+    )
+    df2["y_offset"] = df2["Score"] + df2.offset_o // 5 / 2
+
+    # Create scatter plot
+    fig = px.scatter(
+        df2,
+        x="x_offset",
+        y="y_offset",
+        text=df2.show,
+        labels={"x_index": "Leverage Index", "y_offset": "Score"},
+        title="Score vs. Max Leverage Index on HL",
+        hover_name=df2.index,
+        template="plotly_dark",  # <--- dark mode template
     )
-)
-import plotly.graph_objects as go
 
-lev_to_idx = {lev: i for i, lev in enumerate(lev_map)}
-
-bars = []
-for lev, x_min in SCORE_UB.items():
-    if lev not in lev_map:
-        continue
-    xi = lev_to_idx[lev]
-    height = max(0.0, 100.0 - float(x_min))
-    bars.append(
-        go.Bar(
-            x=[xi],
-            y=[height],  # bar height
-            base=[x_min],  # start at x_min, extend to 100
-            width=0.8,
-            marker=dict(color="rgba(0,200,0,0.25)"),  # transparent green
-            showlegend=False,
-            hoverinfo="skip",
+    # hover text is assembled a column at a time rather than per coin
+    lev = df2["Max Lev. on HL"]
+    hover = (
+        "<b> "
+        + df2.coin
+        + "</b><br>"
+        + ("Current HL Leverage Limit: " + lev.astype(str) + "<br>").where(
+            lev != 0, "Not listed on Hyperliquid<br>"
         )
+        + "Score: "
+        + df2.Score.astype(str)
+        + "<br>"
     )
-for lev, x_min in SCORE_LB.items():
-    if lev not in lev_map:
-        continue
-    xi = lev_to_idx[lev]
-    bars.append(
-        go.Bar(
-            x=[xi],
-            y=[x_min],  # bar height
-            base=[0],  # start at x_min, extend to 100
-            width=0.8,
-            marker=dict(color="rgba(200,0,0,0.25)"),  # transparent green
-            showlegend=False,
-            hoverinfo="skip",
+    for k, v in SCORE_CUTOFFS.items():
+        hover += f"{k}: " + df2[k].astype(str) + "<br>"
+        for v1 in v:
+            hover += f" {v1}: " + sig_figs_text(df2[v1], 3) + "<br>"
+
+    fig.update_traces(
+        mode="markers+text",
+        textfont=dict(size=8),
+        hovertemplate=hover.tolist(),
+        marker=dict(size=8, opacity=0.75),
+        textposition="middle center",
+    )
+
+    fig.update_layout(
+        xaxis=dict(
+            tickvals=list(range(len(lev_list[:4]))),
+            ticktext=[str(x) for x in lev_list],
+            title="Max Leverage on Hyperliquid",
         )
     )
+    lev_to_idx = {lev: i for i, lev in enumerate(lev_map)}
+
+    bars = []
+    for lev, x_min in SCORE_UB.items():
+        if lev not in lev_map:
+            continue
+        xi = lev_to_idx[lev]
+        height = max(0.0, 100.0 - float(x_min))
+        bars.append(
+            go.Bar(
+                x=[xi],
+                y=[height],  # bar height
+                base=[x_min],  # start at x_min, extend to 100
+                width=0.8,
+                # transparent green
+                marker=dict(color="rgba(0,200,0,0.25)"),
+                showlegend=False,
+                hoverinfo="skip",
+            )
+        )
+    for lev, x_min in SCORE_LB.items():
+        if lev not in lev_map:
+            continue
+        xi = lev_to_idx[lev]
+        bars.append(
+            go.Bar(
+                x=[xi],
+                y=[x_min],  # bar height
+                base=[0],  # start at x_min, extend to 100
+                width=0.8,
+                # transparent green
+                marker=dict(color="rgba(200,0,0,0.25)"),
+                showlegend=False,
+                hoverinfo="skip",
+            )
+        )
 
-# 1) Add bar traces (currently they’ll be on TOP)
-for bar in bars:
-    fig.add_trace(bar)
-
-# 2) Reorder traces so bars are at the BACK
-k = len(bars)
-if k:
-    n = len(fig.data)
-    # bars are the last k traces; move them to the front
-    new_order = list(range(n - k, n)) + list(range(0, n - k))
-    fig.data = tuple(fig.data[i] for i in new_order)  # permutation -> allowed
-
-# style/layout for overlayed bars
-fig.update_layout(barmode="overlay")
-fig.update_yaxes(range=[30, 101])
-fig.update_layout(
-    paper_bgcolor="rgba(0,0,0,0)",  # outer background
-    plot_bgcolor="rgba(0,0,0,0)",  # inner plotting area
-)
-fig.show(renderer="browser")
-fig_json = fig.to_json()
-with open("hl_delisting_data.json", "w") as f:
-    json.dump(
-        {
-            "data": df_for_main_data.to_dict(orient="records"),
-            "meta": {
-                "time": datetime.datetime.now().isoformat()[:10],
-                "version": 1.1,
-            },
-            "fig": json.loads(fig_json),
+    # 1) Add bar traces (currently they’ll be on TOP)
+    for bar in bars:
+        fig.add_trace(bar)
+
+    # 2) Reorder traces so bars are at the BACK
+    k = len(bars)
+    if k:
+        n = len(fig.data)
+        # bars are the last k traces; move them to the front
+        new_order = list(range(n - k, n)) + list(range(0, n - k))
+        # permutation -> allowed
+        fig.data = tuple(fig.data[i] for i in new_order)
+
+    # style/layout for overlayed bars
+    fig.update_layout(barmode="overlay")
+    fig.update_yaxes(range=[30, 101])
+    fig.update_layout(
+        paper_bgcolor="rgba(0,0,0,0)",  # outer background
+        plot_bgcolor="rgba(0,0,0,0)",  # inner plotting area
+    )
+
+    return fig
+
+
+# %% BACKTEST
+BACKTEST_CSV: str = "hl_delisting_backtest.csv"
+
+
+def as_of_days(df: pd.DataFrame, days: pd.DatetimeIndex) -> pd.DataFrame:
+    # sources without history repeat their current values every day
+    return pd.concat({day: df for day in days}, names=["day"])
+
+
+def process_reference_exch_history(days: pd.DatetimeIndex) -> pd.DataFrame:
+    # process_reference_exch_data as of every day, on a dense day grid, so
+    # a market missing a day has a gap rather than an older candle instead
+    window = int(DAYS_TO_CONSIDER)
+    first_day = days[0].value // 10**6 - window * DAY_MS
+    parts: dict[SpotFut, list[tuple[int, np.ndarray, np.ndarray]]] = {}
+
+    for e, (exch, exch_spec) in enumerate(REFERENCE_EXCH.items()):
+        print_message(f"Processing {exch} history", level=2)
+        markets = MARKET_CACHE.markets(exch)
+        for spot_fut in exch_spec:
+            store = CandleStore.load(get_fn(exch, spot_fut))
+            candles = store.to_frame(store.selected)
+            symbols = list(candles.symbol.cat.categories)
+            if not symbols:
+                continue
+            metrics = np.stack(
+                candle_metrics(
+                    candle_grid(candles, first_day, len(days) + window),
+                    window,
+                )
+            )
+            metrics[0] *= get_contract_sizes(markets, symbols)[:, None] / 1e6
+
+            # max volume market per coin and day, the later market winning
+            coins, rows = best_per_group(
+                metrics[0], np.array(SYMBOLS.normalize_many(symbols, exch))
+            )
+            best = np.take_along_axis(
+                metrics, np.maximum(rows, 0)[None].repeat(3, axis=0), axis=1
+            )
+            best[:, rows < 0] = np.nan
+            parts.setdefault(spot_fut, []).append((e, coins, best))
+
+    all_coins, tensors = coin_exchange_tensors(parts)
+    columns: dict[str, np.ndarray] = {}
+    listed = np.zeros((len(all_coins), len(days)), dtype=bool)
+    for spot_fut, (volume, std, intra_day_range) in sorted(tensors.items()):
+        label = {"spot": "Spot", "futures": "Fut"}[spot_fut]
+        present = ~np.isnan(volume)
+        listed |= present.any(axis=1)
+        top_three = np.sort(np.log(np.where(present, volume, 0) + 1), axis=1)
+        with warnings.catch_warnings():
+            # coins not traded on any exchange that day
+            warnings.simplefilter("ignore", RuntimeWarning)
+            columns |= {
+                f"{label} Volume Geomean-3 $m": np.exp(
+                    top_three[:, -3:].sum(axis=1) / 3
+                )
+                - 1,
+                f"{label} Volume $m": np.nansum(volume, axis=1),
+                f"{label} Volatility (std)": np.nanmedian(
+                    np.where(present, np.nan_to_num(std), np.nan), axis=1
+                ),
+                f"{label} Intraday range (std)": np.nanmedian(
+                    np.where(present, np.nan_to_num(intra_day_range), np.nan),
+                    axis=1,
+                ),
+            }
+
+    output_df = pd.DataFrame(
+        {name: values.T.ravel() for name, values in columns.items()},
+        index=pd.MultiIndex.from_product(
+            [days, all_coins], names=["day", "coin"]
+        ),
+    )
+    return output_df.loc[listed.T.ravel()].fillna(0)
+
+
+def process_thunderhead_history(
+    raw_thunder_data: dict[str, list[dict[str, Any]]],
+    days: pd.DatetimeIndex,
+) -> pd.DataFrame:
+    history = thunderhead_history(raw_thunder_data)
+    history.index = pd.to_datetime(history.index)
+    as_of = (
+        history.rolling(THUNDERHEAD_DAYS, min_periods=1)
+        .mean()
+        .reindex(days, method="ffill")
+    )
+    return summarize_thunderhead(
+        as_of.rename_axis("day").stack(level=1, future_stack=True)
+    )
+
+
+def backtest(
+    raw: dict[str, Any], start: datetime.date, end: datetime.date
+) -> pd.DataFrame:
+    # scores and recommendations as of every day from start to end, indexed
+    # by (day, coin); HL leverage and market caps have no history, so
+    # today's are used throughout
+    days = pd.date_range(start, end, freq="D", name="day")
+    print_message(f"Backtesting {len(days)} days from {start} to {end}")
+    processed = {
+        "cmc": as_of_days(process_cmc_data(raw["cmc"]), days),
+        "ref": process_reference_exch_history(days),
+        "hl": as_of_days(process_hl_data(raw["hl"]), days),
+        "thunderhead": process_thunderhead_history(raw["thunderhead"], days),
+    }
+    df = merge_stage(processed)
+    df.index.names = ["day", "coin"]
+    return score_stage(df)
+
+
+# %% PIPELINE
+STAGES: list[str] = ["download", "process", "merge", "score", "render"]
+# any edit to the package invalidates every stage after the download, so
+# its helpers, private ones too, cannot leave a stage reusing a stale cache;
+# the script's own helpers are listed per stage and its constants are config
+PIPELINE_MODULES = [delisting_recos]
+
+
+async def dl_all_data() -> dict[str, Any]:
+    print_message(
+        "Downloading Hyperliquid, Thunderhead and CoinMarketCap data",
+        level=1,
+    )
+    print_message(
+        "Downloading reference exchange data concurrently using CCXT", level=1
+    )
+    api_data, _ = await asyncio.gather(
+        asyncio.to_thread(dl_api_data), dl_reference_exch_data()
+    )
+    return api_data
+
+
+def download_stage() -> dict[str, Any]:
+    print_message("Downloading data")
+    return {
+        **asyncio.run(dl_all_data()),
+        # candles stay on disk, their index files tell if they changed
+        "candles": {
+            get_fn(exch, spot_fut): os.stat(
+                get_fn(exch, spot_fut) + ".index.json"
+            ).st_mtime_ns
+            for exch, exch_spec in REFERENCE_EXCH.items()
+            for spot_fut in exch_spec
+            if os.path.exists(get_fn(exch, spot_fut) + ".index.json")
         },
-        f,
+    }
+
+
+def process_stage(raw: dict[str, Any]) -> dict[str, pd.DataFrame]:
+    print_message("Processing data")
+    print_message("Processing reference exchange data", level=1)
+    with TRACER.span("reference") as span:
+        proc_ref_data = process_reference_exch_data()
+        span.record_rows(output=proc_ref_data)
+    with TRACER.span("windows") as span:
+        # only for coins process_reference_exch_data keeps
+        proc_windows_data = process_reference_exch_windows().reindex(
+            proc_ref_data.index, fill_value=0
+        )
+        span.record_rows(output=proc_windows_data)
+    print_message("Processing Hyperliquid API sourced data", level=1)
+    with TRACER.span("hl") as span:
+        proc_hl_data = process_hl_data(raw["hl"])
+        span.record_rows(output=proc_hl_data)
+    print_message("Processing Thunderhead API sourced data", level=1)
+    with TRACER.span("thunderhead") as span:
+        proc_thunderhead_data = process_thunderhead_data(raw["thunderhead"])
+        span.record_rows(output=proc_thunderhead_data)
+    print_message("Processing CoinMarketCap API sourced data", level=1)
+    with TRACER.span("cmc") as span:
+        proc_cmc_data = process_cmc_data(raw["cmc"])
+        span.record_rows(output=proc_cmc_data)
+    return {
+        "cmc": proc_cmc_data,
+        "ref": proc_ref_data,
+        "windows": proc_windows_data,
+        "hl": proc_hl_data,
+        "thunderhead": proc_thunderhead_data,
+    }
+
+
+def merge_stage(processed: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    print_message("Merging data")
+    df: pd.DataFrame = pd.concat(list(processed.values()), axis=1)
+    # backtests index by (day, coin)
+    coins = df.index.get_level_values(-1)
+    df = df.loc[~coins.isin(STABLE_COINS)]
+
+    df["Symbol"] = df.index.get_level_values(-1)
+    df["Max Lev. on HL"] = df["Max Lev. on HL"].fillna(0)
+    return compact_frame(df, MERGED_SCHEMA)
+
+
+def score_stage(df: pd.DataFrame) -> pd.DataFrame:
+    print_message("Building recommendations")
+    print_message("Scoring", level=1)
+    with TRACER.span("scores"):
+        df = pd.concat([df, build_scores(df)], axis=1)
+    print_message("Generating recommendations", level=1)
+    with TRACER.span("recommendations"):
+        df["Recommendation"] = generate_recommendations(df)
+    return df
+
+
+def render_stage(df: pd.DataFrame, show: bool = True) -> None:
+    print_message("Rendering outputs")
+    render_outputs(df, show)
+
+
+def run_stage(
+    stages: StageCache,
+    name: str,
+    fn: Callable[..., Any],
+    *deps: str,
+    **kwargs: Any,
+) -> Any:
+    # StageCache.run in a span that counts the rows going in and out
+    with TRACER.span(name) as span:
+        output = stages.run(name, fn, *deps, **kwargs)
+        span.record_rows({dep: stages.outputs[dep] for dep in deps}, output)
+    return output
+
+
+def finish_run(report_fn: str) -> None:
+    previous = None
+    if os.path.exists(report_fn):
+        with open(report_fn) as f:
+            previous = json.load(f)
+    TRACER.write_report(report_fn)
+    print_message(TRACER.summary(previous), level=0)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Build the Hyperliquid delisting recommendations. Each "
+        "stage's output is cached and reused while its inputs are unchanged."
+    )
+    parser.add_argument(
+        "--force",
+        nargs="+",
+        default=[],
+        choices=[*STAGES, "all"],
+        help="stages to rerun even if cached",
+    )
+    parser.add_argument(
+        "--skip",
+        nargs="+",
+        default=[],
+        choices=STAGES,
+        help="stages to take from the cache even if stale",
+    )
+    parser.add_argument("--cache-dir", default=".recos_cache")
+    parser.add_argument(
+        "--backtest",
+        nargs=2,
+        type=datetime.date.fromisoformat,
+        metavar=("START", "END"),
+        help=f"write daily recommendations over a date range to "
+        f"{BACKTEST_CSV} instead of building today's",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="never open the figure in a browser, e.g. for cron or CI runs",
+    )
+    parser.add_argument(
+        "--report",
+        default=RUN_REPORT_JSON,
+        help="where to write the timings, memory and requests of the run",
+    )
+    args = parser.parse_args(argv)
+    try:
+        build(args)
+    finally:
+        finish_run(args.report)
+
+
+def build(args: argparse.Namespace) -> None:
+    stages = StageCache(
+        args.cache_dir,
+        force=STAGES if "all" in args.force else args.force,
+        skip=args.skip,
+    )
+    # downloads are refreshed once a day unless forced
+    run_stage(
+        stages,
+        "download",
+        download_stage,
+        code=[
+            dl_all_data,
+            dl_api_data,
+            dl_reference_exch_data,
+            download_exch,
+            download_one_exch,
+        ],
+        config=[datetime.date.today().isoformat(), REFERENCE_EXCH],
+    )
+    if args.backtest:
+        with TRACER.span("backtest"):
+            df = backtest(stages.outputs["download"], *args.backtest)
+        df[OUTPUT_COLS].to_csv(BACKTEST_CSV)
+        print_message(f"Wrote {BACKTEST_CSV}", level=0)
+        return
+    run_stage(
+        stages,
+        "process",
+        process_stage,
+        "download",
+        code=[
+            process_reference_exch_data,
+            summarize_exch_candles,
+            get_contract_sizes,
+            top_k_geomean,
+            top_k_per_group,
+            process_reference_exch_windows,
+            coin_exchange_tensors,
+            candle_grid,
+            best_per_group,
+            window_stats,
+            process_hl_data,
+            process_thunderhead_data,
+            thunderhead_history,
+            summarize_thunderhead,
+            process_cmc_data,
+            clean_symbol,
+            SymbolNormalizer,
+        ],
+        modules=PIPELINE_MODULES,
+        config=[
+            REFERENCE_EXCH,
+            TOKEN_ALIASES,
+            EXCH_TOKEN_ALIASES,
+            DAYS_TO_CONSIDER,
+            METRIC_WINDOWS,
+            earliest_ts_to_keep() // (24 * 60 * 60),
+        ],
+    )
+    run_stage(
+        stages,
+        "merge",
+        merge_stage,
+        "process",
+        code=[compact_frame],
+        modules=PIPELINE_MODULES,
+        config=[sorted(STABLE_COINS), MERGED_SCHEMA],
+    )
+    run_stage(
+        stages,
+        "score",
+        score_stage,
+        "merge",
+        code=[
+            build_scores,
+            generate_recommendations,
+            ThresholdScorer,
+            compile_cutoffs,
+            recommend,
+            recommendation_codes,
+            tier_bounds,
+        ],
+        modules=PIPELINE_MODULES,
+        config=[
+            SCORE_CUTOFFS,
+            SCORE_DTYPE,
+            SCORE_UB,
+            SCORE_LB,
+            sorted(HL_STRICT),
+            HL_STRICT_BOOST,
+            NON_HL_BOOST,
+            NON_HL_BOOST_CATEGORIES,
+        ],
+    )
+
+    def render(df: pd.DataFrame) -> None:
+        render_stage(df, show=not args.headless)
+
+    run_stage(
+        stages,
+        "render",
+        render,
+        "score",
+        code=[
+            render_stage,
+            render_outputs,
+            build_figure,
+            sig_figs,
+            sig_figs_text,
+            to_columnar,
+            write_compressed,
+            write_shards,
+            write_manifest,
+        ],
+        modules=PIPELINE_MODULES,
+        config=[
+            OUTPUT_COLS,
+            OUTPUT_JSON,
+            FIGURE_JSON,
+            SHARD_DIR,
+            SHARD_COUNT,
+            MANIFEST_JSON,
+            SUMMARY_COLS,
+            SCORE_UB,
+            SCORE_LB,
+            LEV_MAP,
+        ],
     )
+    print_message("Comparing with the previous run")
+    publish_delta(stages.outputs["score"], args.cache_dir)
+    print_message("Completed recommendation data build", level=0)
 
 
-print_message("Completed recommendation data build", level=0)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Building blocks for the Hyperliquid delisting recommendation build."""
+
+from __future__ import annotations
+
+__all__ = [
+    "CANDLE_COLUMNS",
+    "DELTA_CHANGES",
+    "RECOMMENDATIONS",
+    "Candle",
+    "CandleStore",
+    "CatLabel",
+    "DAY_MS",
+    "Coin",
+    "CutoffSpec",
+    "ExchangeName",
+    "HttpCache",
+    "HttpRequest",
+    "MarketCache",
+    "ScoreConfig",
+    "Span",
+    "SpotFut",
+    "StageCache",
+    "Symbol",
+    "SymbolNormalizer",
+    "ThresholdScorer",
+    "TokenBucket",
+    "Tracer",
+    "as_float",
+    "best_per_group",
+    "candle_grid",
+    "candle_metrics",
+    "compact_frame",
+    "download_markets",
+    "compile_cutoffs",
+    "fetch_json_all",
+    "make_session",
+    "recommend",
+    "recommendation_codes",
+    "select_liquid_markets",
+    "score_delta",
+    "sweep",
+    "tier_bounds",
+    "to_columnar",
+    "top_k_geomean",
+    "top_k_per_group",
+    "window_stats",
+    "write_compressed",
+    "write_manifest",
+    "write_shards",
+]
+
+
+from ._asof import DAY_MS
+from ._asof import best_per_group
+from ._asof import candle_grid
+from ._asof import candle_metrics
+from ._asof import window_stats
+from ._candles import CANDLE_COLUMNS
+from ._candles import CandleStore
+from ._delta import DELTA_CHANGES
+from ._delta import score_delta
+from ._download import TokenBucket
+from ._download import download_markets
+from ._download import select_liquid_markets
+from ._frames import compact_frame
+from ._groups import top_k_geomean
+from ._groups import top_k_per_group
+from ._http import HttpCache
+from ._http import HttpRequest
+from ._http import fetch_json_all
+from ._http import make_session
+from ._markets import MarketCache
+from ._output import to_columnar
+from ._output import write_compressed
+from ._output import write_manifest
+from ._output import write_shards
+from ._scoring import RECOMMENDATIONS
+from ._scoring import ThresholdScorer
+from ._scoring import as_float
+from ._scoring import compile_cutoffs
+from ._scoring import recommend
+from ._scoring import recommendation_codes
+from ._scoring import tier_bounds
+from ._spans import Span
+from ._spans import Tracer
+from ._stages import StageCache
+from ._sweep import ScoreConfig
+from ._sweep import sweep
+from ._symbols import SymbolNormalizer
+from ._types import Candle
+from ._types import CatLabel
+from ._types import Coin
+from ._types import CutoffSpec
+from ._types import ExchangeName
+from ._types import SpotFut
+from ._types import Symbol
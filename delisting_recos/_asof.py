@@ -0,0 +1,145 @@
+"""Rolling metrics over dense candle grids and coin tensors."""
+
+from __future__ import annotations
+
+__all__ = [
+    "DAY_MS",
+    "best_per_group",
+    "candle_grid",
+    "candle_metrics",
+    "window_stats",
+]
+
+import warnings
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+DAY_MS: int = 24 * 60 * 60 * 1000
+
+# windowed cells materialized at once by candle_metrics
+_CHUNK_CELLS: int = 1 << 22
+
+
+# ────────────────────────────────────────────────────────────────
+# public
+def candle_grid(frame: pd.DataFrame, first_day: int, days: int) -> np.ndarray:
+    """(5, markets, days) o, h, l, c, v of daily candles, nan if missing.
+
+    `frame` is a `CandleStore.to_frame`; markets follow its symbol
+    categories and day `i` opens at `first_day + i * DAY_MS` (ms).
+    """
+    n_markets = len(frame.symbol.cat.categories)
+    grid = np.full((5, n_markets, days), np.nan)
+    day = (frame.t.to_numpy() - first_day) // DAY_MS
+    keep = (day >= 0) & (day < days)
+    rows = frame.symbol.cat.codes.to_numpy()[keep]
+    cols = day[keep].astype(np.int64)
+    for i, col in enumerate("ohlcv"):
+        grid[i, rows, cols] = frame[col].to_numpy()[keep]
+    return grid
+
+
+def candle_metrics(
+    grid: np.ndarray, window: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Volume, volatility and intraday range of every market as of each day.
+
+    As of day `g` the candle of `g` is still open and the `window` days
+    before it are closed, as in `summarize_exch_candles`: the volume is
+    the mean quote volume over those days, valued at the lower of each
+    day's low and the last close, and volatility and intraday range are
+    the std of the returns and high/low ranges of the last two of them.
+
+    Returns (markets, days - window) arrays for days `window` onwards.
+    """
+    _, high, low, close, volume = grid
+    n_markets, n_days = close.shape
+    n_out = n_days - window
+
+    last_close = close[:, window - 1 : n_days - 1]
+    quote = np.empty((n_markets, n_out))
+    step = max(1, _CHUNK_CELLS // max(1, n_out * window))
+    for i in range(0, n_markets, step):
+        lows = sliding_window_view(low[i : i + step], window, axis=1)
+        vols = sliding_window_view(volume[i : i + step], window, axis=1)
+        valued = (
+            np.minimum(lows[:, :n_out], last_close[i : i + step, :, None])
+            * vols[:, :n_out]
+        )
+        counts = (~np.isnan(valued)).sum(axis=-1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            quote[i : i + step] = np.nansum(valued, axis=-1) / counts
+
+    returns = np.full_like(close, np.nan)
+    returns[:, 1:] = close[:, 1:] / close[:, :-1] - 1
+    ranges = high / low - 1
+    # as of day g the last two closed days are g - 1 and g - 2
+    std = _std2(
+        returns[:, window - 1 : n_days - 1], returns[:, window - 2 : -2]
+    )
+    intra_day_range = _std2(
+        ranges[:, window - 1 : n_days - 1], ranges[:, window - 2 : -2]
+    )
+    return quote, std, intra_day_range
+
+
+def best_per_group(
+    values: np.ndarray, groups: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Row of the largest value of each group, per column.
+
+    `values` is (rows, columns) and `groups` labels its rows. Of equal
+    values the later row wins; nan is never picked, and a group whose
+    column is all nan gets -1.
+
+    Returns the sorted unique groups and their (groups, columns) rows.
+    """
+    order = np.argsort(groups, kind="stable")
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(
+        np.r_[True, sorted_groups[1:] != sorted_groups[:-1]]
+    )
+    ordered = values[order]
+    best = np.fmax.reduceat(ordered, starts, axis=0)
+    sizes = np.diff(np.r_[starts, len(order)])
+    is_best = ordered == np.repeat(best, sizes, axis=0)
+    rows = np.where(is_best, order[:, None], -1)
+    return sorted_groups[starts], np.maximum.reduceat(rows, starts, axis=0)
+
+
+def window_stats(
+    tensor: np.ndarray, windows: list[int]
+) -> dict[int, np.ndarray]:
+    """Trailing-window statistics of a (3, coins, exchanges, days) tensor.
+
+    The tensor holds daily quote volume, log return and high/low range,
+    its last day still open. For every window the result is (3, coins,
+    exchanges): the mean volume, the return std (realized volatility)
+    and the mean range over the `window` closed days before it, each a
+    single reduction over the day axis.
+    """
+    volume, returns, ranges = tensor
+    out: dict[int, np.ndarray] = {}
+    with warnings.catch_warnings():
+        # coins without candles on an exchange over the whole window
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for window in windows:
+            days = slice(-window - 1, -1)
+            out[window] = np.stack(
+                [
+                    np.nanmean(volume[..., days], axis=-1),
+                    np.nanstd(returns[..., days], axis=-1, ddof=1),
+                    np.nanmean(ranges[..., days], axis=-1),
+                ]
+            )
+    return out
+
+
+# ────────────────────────────────────────────────────────────────
+# private
+def _std2(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Sample std of two values, as pandas computes it; nan if either is."""
+    mean = (a + b) / 2
+    return np.sqrt((a - mean) ** 2 + (b - mean) ** 2)
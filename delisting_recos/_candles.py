@@ -0,0 +1,329 @@
+"""Persistent per-market candle history."""
+
+from __future__ import annotations
+
+__all__ = [
+    "CANDLE_COLUMNS",
+    "CandleStore",
+]
+
+import json
+import os
+from typing import IO
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from ._types import Candle
+from ._types import Symbol
+
+CANDLE_COLUMNS: list[str] = [*"tohlcv"]
+
+
+# ────────────────────────────────────────────────────────────────
+# public
+class CandleStore:
+    """Candles for one (exchange, spot/futures) pair, keyed by market.
+
+    Stored columnar as `<stem>.npy`, a (6, rows) float64 array holding the
+    t, o, h, l, c and v columns back to back, plus `<stem>.index.json`
+    with each market's [start, stop) row range and the `selected` markets.
+    The array is memory-mapped on load, so reading a market or the whole
+    store does not copy it.
+
+    Remembers the last timestamp of every market so a refresh only has to
+    fetch candles from that point on, which are then merged in by timestamp.
+
+    Appended candles are not held in memory but streamed to an append-only
+    `<stem>.journal.ndjson`, one line per market, and only folded into the
+    array by `save`. A store loaded after an interrupted run replays the
+    journal and reports its markets as `completed`, so the download can
+    resume where it stopped.
+
+    Markets left out of the current selection keep their candles, so one
+    that is selected again later only needs the candles it missed.
+    """
+
+    def __init__(
+        self,
+        stem: str,
+        data: np.ndarray | None = None,
+        offsets: dict[Symbol, tuple[int, int]] | None = None,
+        max_candles: int = 1000,
+        selected: list[Symbol] | None = None,
+    ) -> None:
+        self.stem = stem
+        self.max_candles = max_candles
+        self._data = np.empty((6, 0)) if data is None else data
+        self._offsets: dict[Symbol, tuple[int, int]] = offsets or {}
+        self._selected = selected
+        # byte offsets of each market's lines in the journal
+        self._journaled: dict[Symbol, list[int]] = {}
+        self._journal: IO[str] | None = None
+
+    @classmethod
+    def load(cls, stem: str, max_candles: int = 1000) -> CandleStore:
+        """Memory-map a store from disk, or start an empty one."""
+        try:
+            with open(stem + ".index.json") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            store = cls._load_legacy_json(stem, max_candles)
+        else:
+            store = cls._load_npy(stem, index, max_candles)
+        store._scan_journal()
+        return store
+
+    @property
+    def completed(self) -> set[Symbol]:
+        """Markets appended since the last save, e.g. before a crash."""
+        return set(self._journaled)
+
+    def __contains__(self, symbol: Symbol) -> bool:
+        return symbol in self._journaled or symbol in self._offsets
+
+    def __getitem__(self, symbol: Symbol) -> np.ndarray:
+        """(6, n) candles of a market, oldest first.
+
+        A view of the memory-mapped array unless the market was appended to
+        since the last save.
+        """
+        if symbol in self._offsets:
+            start, stop = self._offsets[symbol]
+            candles = self._data[:, start:stop]
+        else:
+            candles = np.empty((6, 0))
+        for pos in self._journaled.get(symbol, []):
+            candles = self._merge(candles, self._read_journal(pos))
+        return candles
+
+    def __len__(self) -> int:
+        return len(self.symbols())
+
+    def symbols(self) -> list[Symbol]:
+        return [
+            *self._offsets,
+            *(s for s in self._journaled if s not in self._offsets),
+        ]
+
+    @property
+    def selected(self) -> list[Symbol]:
+        """Stored markets of the last `select`, every market without one.
+
+        In store order, like `symbols`.
+        """
+        if self._selected is None:
+            return self.symbols()
+        selected = set(self._selected)
+        return [s for s in self.symbols() if s in selected]
+
+    def select(self, symbols: list[Symbol]) -> None:
+        """Mark the markets currently downloaded, saved with the index."""
+        self._selected = list(symbols)
+
+    def items(self):
+        return ((symbol, self[symbol]) for symbol in self.symbols())
+
+    def last_ts(self, symbol: Symbol) -> int | None:
+        """Timestamp (ms) of the newest stored candle for a market."""
+        if symbol not in self:
+            return None
+        candles = self[symbol]
+        return int(candles[0, -1]) if candles.shape[1] else None
+
+    def since(self, symbol: Symbol) -> int | None:
+        """Timestamp (ms) to resume fetching a market from.
+
+        The newest stored candle is fetched again since it was most likely
+        still open when it was downloaded.
+        """
+        return self.last_ts(symbol)
+
+    def append(self, symbol: Symbol, candles: list[Candle]) -> int:
+        """Journal freshly fetched candles, returning how many are new."""
+        old = self[symbol] if symbol in self else np.empty((6, 0))
+        n_new = self._merge(old, _to_columns(candles), trim=False).shape[1]
+
+        if self._journal is None:
+            self._journal = open(self.stem + ".journal.ndjson", "a")
+        self._journaled.setdefault(symbol, []).append(self._journal.tell())
+        self._journal.write(
+            json.dumps({"symbol": symbol, "candles": candles}) + "\n"
+        )
+        self._journal.flush()
+        return n_new - old.shape[1]
+
+    def to_frame(self, symbols: list[Symbol] | None = None) -> pd.DataFrame:
+        """Candles as one long frame with a categorical symbol column.
+
+        Holds the markets in `symbols`, all of them by default. When those
+        are all markets and nothing was appended since loading, the candle
+        columns are views of the memory-mapped array.
+        """
+        symbols = self.symbols() if symbols is None else list(symbols)
+        data, offsets = (
+            (self._data, self._offsets)
+            if not self._journaled and symbols == list(self._offsets)
+            else self._concatenated(symbols)
+        )
+        frame = pd.DataFrame(data.T, columns=CANDLE_COLUMNS, copy=False)
+        lengths = [offsets[s][1] - offsets[s][0] for s in symbols]
+        frame.insert(
+            0,
+            "symbol",
+            pd.Categorical.from_codes(
+                np.repeat(np.arange(len(symbols)), lengths), symbols
+            ),
+        )
+        return frame
+
+    def save(self) -> None:
+        """Atomically fold the journal into the array on disk.
+
+        Markets are merged one at a time straight into the new file, so
+        memory use does not grow with the number of markets.
+        """
+        symbols = self.symbols()
+        lengths = [self._length(s) for s in symbols]
+        stops = np.cumsum(lengths, dtype=int).tolist()
+        offsets = {
+            s: (stop - n, stop) for s, n, stop in zip(symbols, lengths, stops)
+        }
+        rows = stops[-1] if stops else 0
+
+        if rows:
+            data = np.lib.format.open_memmap(
+                self.stem + ".npy.tmp", mode="w+", shape=(6, rows)
+            )
+            for symbol in symbols:
+                start, stop = offsets[symbol]
+                data[:, start:stop] = self[symbol]
+            data.flush()
+            del data
+        else:
+            with open(self.stem + ".npy.tmp", "wb") as f:
+                np.save(f, np.empty((6, 0)))
+        with open(self.stem + ".index.json.tmp", "w") as f:
+            json.dump(
+                {
+                    "columns": CANDLE_COLUMNS,
+                    "rows": rows,
+                    "offsets": offsets,
+                    "selected": self._selected,
+                },
+                f,
+            )
+        # Windows cannot replace a file while it is memory-mapped, so the
+        # old array is released first; it is reloaded from the new file below
+        self._data = np.empty((6, 0))
+        # the index is replaced last, so it never points past the data, and
+        # the journal is only dropped once both are in place
+        os.replace(self.stem + ".npy.tmp", self.stem + ".npy")
+        os.replace(self.stem + ".index.json.tmp", self.stem + ".index.json")
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if os.path.exists(self.stem + ".journal.ndjson"):
+            os.remove(self.stem + ".journal.ndjson")
+
+        self._data = (
+            np.load(self.stem + ".npy", mmap_mode="r")
+            if rows
+            else np.empty((6, 0))
+        )
+        self._offsets, self._journaled = offsets, {}
+
+    # ────────────────────────────────────────────────────────────────
+    # private
+    @classmethod
+    def _load_npy(
+        cls, stem: str, index: dict[str, Any], max_candles: int
+    ) -> CandleStore:
+        data = (
+            np.load(stem + ".npy", mmap_mode="r")
+            if index["rows"]
+            else np.empty((6, 0))
+        )
+        if data.shape != (6, index["rows"]):
+            raise ValueError(f"{stem}.npy does not match its index")
+        offsets = {sym: (a, b) for sym, (a, b) in index["offsets"].items()}
+        return cls(
+            stem,
+            data,
+            offsets,
+            max_candles=max_candles,
+            selected=index.get("selected"),
+        )
+
+    @classmethod
+    def _load_legacy_json(cls, stem: str, max_candles: int) -> CandleStore:
+        store = cls(stem, max_candles=max_candles)
+        try:
+            with open(stem + ".json") as f:
+                legacy: dict[Symbol, list[Candle]] = json.load(f)
+        except FileNotFoundError:
+            return store
+        store._offsets = {symbol: (0, 0) for symbol in legacy}
+        store._data, store._offsets = store._concatenated(
+            [*legacy],
+            [store._merge(store[s], _to_columns(c)) for s, c in legacy.items()],
+        )
+        return store
+
+    def _scan_journal(self) -> None:
+        try:
+            f = open(self.stem + ".journal.ndjson", "r+b")
+        except FileNotFoundError:
+            return
+        with f:
+            pos = 0
+            for line in f:
+                try:
+                    symbol = json.loads(line)["symbol"]
+                except ValueError:
+                    # torn last line of a crashed run
+                    break
+                self._journaled.setdefault(symbol, []).append(pos)
+                pos += len(line)
+            f.truncate(pos)
+
+    def _read_journal(self, pos: int) -> np.ndarray:
+        if self._journal is not None:
+            self._journal.flush()
+        with open(self.stem + ".journal.ndjson") as f:
+            f.seek(pos)
+            return _to_columns(json.loads(f.readline())["candles"])
+
+    def _merge(
+        self, old: np.ndarray, new: np.ndarray, trim: bool = True
+    ) -> np.ndarray:
+        merged = np.concatenate([old, new], axis=1)
+        merged = merged[:, np.argsort(merged[0], kind="stable")]
+        # on duplicate timestamps the fresh candle, which sorts last, wins
+        merged = merged[:, np.diff(merged[0], append=np.inf) != 0]
+        return merged[:, -self.max_candles :] if trim else merged
+
+    def _length(self, symbol: Symbol) -> int:
+        if symbol not in self._journaled:
+            start, stop = self._offsets[symbol]
+            return stop - start
+        return self[symbol].shape[1]
+
+    def _concatenated(
+        self, symbols: list[Symbol], parts: list[np.ndarray] | None = None
+    ) -> tuple[np.ndarray, dict[Symbol, tuple[int, int]]]:
+        parts = [self[s] for s in symbols] if parts is None else parts
+        stops = np.cumsum([p.shape[1] for p in parts]).tolist()
+        offsets = {
+            s: (stop - p.shape[1], stop)
+            for s, p, stop in zip(symbols, parts, stops)
+        }
+        return np.concatenate([np.empty((6, 0)), *parts], axis=1), offsets
+
+
+def _to_columns(candles: list[Candle]) -> np.ndarray:
+    if not candles:
+        return np.empty((6, 0))
+    # ccxt reports missing values as None, which become nan here
+    return np.array([c[:6] for c in candles], dtype=float).T
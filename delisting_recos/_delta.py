@@ -0,0 +1,64 @@
+"""Run-over-run changes of the scored coins."""
+
+from __future__ import annotations
+
+__all__ = [
+    "DELTA_CHANGES",
+    "score_delta",
+]
+
+import numpy as np
+import pandas as pd
+
+# what changed for a coin, in order of precedence
+DELTA_CHANGES: list[str] = ["added", "removed", "recommendation", "score"]
+
+
+# ────────────────────────────────────────────────────────────────
+# public
+def score_delta(
+    previous: pd.DataFrame, current: pd.DataFrame, score_threshold: float
+) -> pd.DataFrame:
+    """Coins whose recommendation or score changed between two runs.
+
+    Both frames are indexed by coin and hold "Recommendation" and "Score".
+    They are aligned with one outer join, and each coin gets the first
+    applicable `DELTA_CHANGES` entry: new to `current`, gone from it, a
+    different recommendation, or a score that moved by `score_threshold`
+    or more. Unchanged coins are dropped.
+
+    Returns the change, the before and after recommendation and score, and
+    the score move of every changed coin, largest moves first.
+    """
+    columns = ["Recommendation", "Score"]
+    previous = _by_coin(previous[columns])
+    current = _by_coin(current[columns])
+    joined = previous.join(
+        current, how="outer", lsuffix=" before", rsuffix=" after"
+    )
+    move = joined["Score after"] - joined["Score before"]
+    conditions = [
+        ~joined.index.isin(previous.index),
+        ~joined.index.isin(current.index),
+        joined["Recommendation before"].astype(object)
+        != joined["Recommendation after"].astype(object),
+        move.abs().ge(score_threshold),
+    ]
+    codes = np.select(conditions, np.arange(len(DELTA_CHANGES)), -1)
+    delta = joined.assign(
+        change=pd.Categorical.from_codes(codes, DELTA_CHANGES),
+        **{"Score change": move},
+    )
+    delta = delta.loc[codes >= 0, ["change", *joined.columns, "Score change"]]
+    return delta.sort_values(
+        ["change", "Score change"],
+        key=lambda c: c.abs() if c.name == "Score change" else c,
+        ascending=[True, False],
+    )
+
+
+# ────────────────────────────────────────────────────────────────
+# private
+def _by_coin(frame: pd.DataFrame) -> pd.DataFrame:
+    """`frame` indexed by plain coin strings, whatever its coin categories."""
+    return frame.set_axis(frame.index.astype(str))
@@ -0,0 +1,215 @@
+"""Rate limited concurrent candle downloads over ccxt.async_support."""
+
+from __future__ import annotations
+
+__all__ = [
+    "TokenBucket",
+    "download_markets",
+    "select_liquid_markets",
+]
+
+import asyncio
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+from typing import Any
+
+import ccxt
+
+if TYPE_CHECKING:
+    from ccxt.async_support.base.exchange import Exchange
+
+    from ._candles import CandleStore
+    from ._types import Candle
+    from ._types import Coin
+    from ._types import Symbol
+
+
+# ────────────────────────────────────────────────────────────────
+# public
+class TokenBucket:
+    """Async token bucket that halves its rate on rate limit errors.
+
+    The rate creeps back up to the base rate on every successful request.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1) -> None:
+        self.base_rate = rate
+        self.rate = rate
+        self.min_rate = rate / 32
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def for_api(cls, api: Exchange) -> TokenBucket:
+        """Bucket matching the exchange's documented ms-per-request."""
+        return cls(1000 / max(api.rateLimit, 1))
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated) * self.rate,
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def backoff(self) -> None:
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._tokens = min(self._tokens, 0) - 1
+
+    def recover(self) -> None:
+        self.rate = min(self.base_rate, self.rate + self.base_rate / 16)
+
+
+async def download_markets(
+    api: Exchange,
+    bucket: TokenBucket,
+    store: CandleStore,
+    markets: list[Symbol],
+    timeframe: str,
+    limit: int,
+    max_in_flight: int = 16,
+    max_retries: int = 5,
+) -> dict[Symbol, Exception]:
+    """Bring every market in the store up to date, returning failures.
+
+    Markets an interrupted run already completed are skipped while their
+    newest candle is still the current one.
+    """
+    in_flight = asyncio.Semaphore(max_in_flight)
+    errors: dict[Symbol, Exception] = {}
+    # a journal left by an older run does not make its markets current
+    current_since = time.time() * 1000 - api.parse_timeframe(timeframe) * 1000
+    completed = {
+        market
+        for market in store.completed
+        if (store.last_ts(market) or 0) >= current_since
+    }
+
+    async def download_one(market: Symbol) -> None:
+        async with in_flight:
+            try:
+                await _fetch_since_last(
+                    api, bucket, store, market, timeframe, limit, max_retries
+                )
+            except Exception as e:
+                errors[market] = e
+
+    await asyncio.gather(
+        *(
+            download_one(market)
+            for market in markets
+            if market not in completed
+        )
+    )
+    return errors
+
+
+async def select_liquid_markets(
+    api: Exchange,
+    bucket: TokenBucket,
+    markets: list[Symbol],
+    coin_of: Callable[[Symbol], Coin],
+    min_quote_volume: float,
+) -> list[Symbol]:
+    """Keep the most traded active market per coin, from one ticker call.
+
+    Falls back to all markets when the exchange cannot return tickers.
+    """
+    if not markets:
+        return []
+    await bucket.acquire()
+    try:
+        tickers = await api.fetch_tickers(markets)
+    except ccxt.BaseError:
+        return markets
+
+    best: dict[Coin, tuple[float, Symbol]] = {}
+    for market in markets:
+        if (api.markets or {}).get(market, {}).get("active") is False:
+            continue
+        quote_volume = _quote_volume(tickers.get(market))
+        if quote_volume < min_quote_volume:
+            continue
+        coin = coin_of(market)
+        if quote_volume > best.get(coin, (-1.0, ""))[0]:
+            best[coin] = (quote_volume, market)
+    return sorted(market for _, market in best.values())
+
+
+# ────────────────────────────────────────────────────────────────
+# private
+def _quote_volume(ticker: dict[str, Any] | None) -> float:
+    if not ticker:
+        return 0.0
+    if ticker.get("quoteVolume") is not None:
+        return float(ticker["quoteVolume"])
+    if ticker.get("baseVolume") is not None and ticker.get("last"):
+        return float(ticker["baseVolume"]) * float(ticker["last"])
+    return 0.0
+
+
+async def _fetch_since_last(
+    api: Exchange,
+    bucket: TokenBucket,
+    store: CandleStore,
+    market: Symbol,
+    timeframe: str,
+    limit: int,
+    max_retries: int,
+) -> None:
+    interval_ms = api.parse_timeframe(timeframe) * 1000
+    since = store.since(market)
+    fetched: list[Candle] = []
+    while True:
+        candles = await _fetch_ohlcv(
+            api, bucket, market, timeframe, since, limit, max_retries
+        )
+        fetched.extend(candles)
+        # only page forward when catching up on a long gap
+        if (
+            since is None
+            or not candles
+            or candles[-1][0] <= since
+            or candles[-1][0] >= time.time() * 1000 - interval_ms
+        ):
+            break
+        since = int(candles[-1][0])
+    # journaled in one go, so a journaled market is a completed one
+    store.append(market, fetched)
+
+
+async def _fetch_ohlcv(
+    api: Exchange,
+    bucket: TokenBucket,
+    market: Symbol,
+    timeframe: str,
+    since: int | None,
+    limit: int,
+    max_retries: int,
+) -> list[Candle]:
+    for attempt in range(max_retries):
+        await bucket.acquire()
+        try:
+            candles = await api.fetch_ohlcv(
+                market, timeframe, since=since, limit=limit
+            )
+        except ccxt.DDoSProtection:
+            # covers RateLimitExceeded / HTTP 429
+            bucket.backoff()
+        except ccxt.NetworkError:
+            await asyncio.sleep(2**attempt)
+        else:
+            bucket.recover()
+            return candles
+
+    await bucket.acquire()
+    return await api.fetch_ohlcv(market, timeframe, since=since, limit=limit)
@@ -0,0 +1,44 @@
+"""Compact dtypes for wide per-coin frames."""
+
+from __future__ import annotations
+
+__all__ = [
+    "compact_frame",
+]
+
+import numpy as np
+import pandas as pd
+
+
+# ────────────────────────────────────────────────────────────────
+# public
+def compact_frame(df: pd.DataFrame, schema: dict[str, str]) -> pd.DataFrame:
+    """`df` with the dtypes of `schema` and a categorical coin index.
+
+    Columns in `schema` are cast to their dtype, parsing numeric strings
+    (as Hyperliquid sends them) on the way. Other float64 columns are
+    downcast to float32, and the coin index, or the coin level of a
+    (day, coin) index, becomes categorical so every frame built from it
+    shares one set of coin labels.
+    """
+    columns: dict[str, pd.Series] = {}
+    for name, column in df.items():
+        dtype = schema.get(str(name))
+        if dtype is None:
+            if column.dtype == np.float64:
+                column = column.astype(np.float32)
+        elif column.dtype == object and pd.api.types.is_float_dtype(dtype):
+            column = pd.to_numeric(column, errors="coerce").astype(dtype)
+        else:
+            column = column.astype(dtype)
+        columns[name] = column
+
+    output_df = pd.DataFrame(columns, index=df.index)
+    if isinstance(df.index, pd.MultiIndex):
+        coins = df.index.levels[-1]
+        output_df.index = df.index.set_levels(
+            pd.CategoricalIndex(coins, name=coins.name), level=-1
+        )
+    else:
+        output_df.index = pd.CategoricalIndex(df.index, name=df.index.name)
+    return output_df
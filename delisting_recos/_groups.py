@@ -0,0 +1,49 @@
+"""Vectorized top-k reductions over labelled groups."""
+
+from __future__ import annotations
+
+__all__ = [
+    "top_k_geomean",
+    "top_k_per_group",
+]
+
+import numpy as np
+
+
+# ────────────────────────────────────────────────────────────────
+# public
+def top_k_per_group(
+    values: np.ndarray, groups: np.ndarray, n_groups: int, k: int
+) -> np.ndarray:
+    """(n_groups, k) largest values of each group, in ascending order.
+
+    `groups` holds each value's group number in [0, n_groups), e.g. from
+    `GroupBy.ngroup`. Groups with fewer than k values are nan padded at
+    the front, so reductions like `np.nanmean(top, axis=1)` give a mean
+    of the top k and `top[:, -1]` is the maximum. Nan values rank below
+    every other value, so they only fill places no value could.
+    """
+    # lexsort would rank nan above every value
+    order = np.lexsort((np.where(np.isnan(values), -np.inf, values), groups))
+    sorted_groups = groups[order]
+    sizes = np.bincount(sorted_groups, minlength=n_groups)
+    # rank of every value counted from the largest of its group
+    ends = np.cumsum(sizes)[sorted_groups]
+    from_end = ends - 1 - np.arange(len(order))
+    keep = from_end < k
+
+    top = np.full((n_groups, k), np.nan)
+    top[sorted_groups[keep], k - 1 - from_end[keep]] = values[order][keep]
+    return top
+
+
+def top_k_geomean(
+    values: np.ndarray, groups: np.ndarray, n_groups: int, k: int = 3
+) -> np.ndarray:
+    """Geometric mean of (1 + value) over the top k of each group, minus 1.
+
+    A group with fewer than k values is still divided by k, so one large
+    value among few does not score like several.
+    """
+    top = top_k_per_group(np.log(values + 1), groups, n_groups, k)
+    return np.exp(np.nansum(top, axis=1) / k) - 1
@@ -0,0 +1,191 @@
+"""Concurrent, cached JSON fetching over a pooled requests session."""
+
+from __future__ import annotations
+
+__all__ = [
+    "HttpCache",
+    "HttpRequest",
+    "fetch_json_all",
+    "make_session",
+]
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) seconds; the full Thunderhead histories are slow to read
+DEFAULT_TIMEOUT: tuple[float, float] = (5, 60)
+
+
+# ────────────────────────────────────────────────────────────────
+# public
+@dataclass(frozen=True)
+class HttpRequest:
+    """One JSON request to issue.
+
+    With a `ttl` (seconds) the response may be served from an HttpCache.
+    """
+
+    method: str
+    url: str
+    params: dict[str, Any] | None = None
+    body: Any = None
+    headers: dict[str, str] | None = None
+    ttl: float = 0
+
+    def cache_key(self) -> str:
+        # hashed, so api keys in params never reach the disk
+        return hashlib.sha256(
+            json.dumps(
+                [self.method, self.url, self.params, self.body],
+                sort_keys=True,
+            ).encode()
+        ).hexdigest()
+
+
+class HttpCache:
+    """Gzipped response bodies with their ETag / Last-Modified validators.
+
+    Fresh entries (younger than the request's ttl) are served without
+    touching the network. Stale ones are revalidated with a conditional
+    request, so an unchanged payload only costs a 304.
+    """
+
+    def __init__(self, cache_dir: str = ".http_cache") -> None:
+        self.cache_dir = cache_dir
+
+    def get(self, key: str) -> tuple[dict[str, Any], bytes] | None:
+        try:
+            with open(self._fn(key, "meta.json")) as f:
+                meta = json.load(f)
+            with gzip.open(self._fn(key, "body.gz")) as f:
+                return meta, f.read()
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+
+    def put(
+        self,
+        key: str,
+        body: bytes | None,
+        etag: str | None,
+        last_modified: str | None,
+    ) -> None:
+        """Store a response; a None body only refreshes the entry's age."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta = {
+            "time": time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+        if body is not None:
+            with gzip.open(self._fn(key, "body.gz.tmp"), "wb") as f:
+                f.write(body)
+            os.replace(self._fn(key, "body.gz.tmp"), self._fn(key, "body.gz"))
+        with open(self._fn(key, "meta.json.tmp"), "w") as f:
+            json.dump(meta, f)
+        os.replace(self._fn(key, "meta.json.tmp"), self._fn(key, "meta.json"))
+
+    # ────────────────────────────────────────────────────────────────
+    # private
+    def _fn(self, key: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.{suffix}")
+
+
+def make_session(pool_size: int = 16, retries: int = 3) -> requests.Session:
+    """Keep-alive session that retries failed and throttled requests."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            # the POSTs we make are read-only queries, safe to repeat
+            allowed_methods=None,
+            raise_on_status=False,
+        ),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+    return session
+
+
+def fetch_json_all(
+    session: requests.Session,
+    reqs: dict[str, HttpRequest],
+    timeout: tuple[float, float] = DEFAULT_TIMEOUT,
+    cache: HttpCache | None = None,
+) -> dict[str, Any]:
+    """Issue all requests at once, returning the decoded JSON by key."""
+    with ThreadPoolExecutor(max_workers=max(len(reqs), 1)) as ex:
+        futures = {
+            key: ex.submit(_fetch_json, session, req, timeout, cache)
+            for key, req in reqs.items()
+        }
+        return {key: future.result() for key, future in futures.items()}
+
+
+# ────────────────────────────────────────────────────────────────
+# private
+def _fetch_json(
+    session: requests.Session,
+    req: HttpRequest,
+    timeout: tuple[float, float],
+    cache: HttpCache | None,
+) -> Any:
+    if cache is None or not req.ttl:
+        return _request(session, req, {}, timeout).json()
+
+    key = req.cache_key()
+    cached = cache.get(key)
+    meta: dict[str, Any] = {"etag": None, "last_modified": None}
+    headers: dict[str, str] = {}
+    if cached is not None:
+        meta, body = cached
+        if time.time() - meta["time"] < req.ttl:
+            return json.loads(body)
+        if meta["etag"]:
+            headers["If-None-Match"] = meta["etag"]
+        if meta["last_modified"]:
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    response = _request(session, req, headers, timeout)
+    etag = response.headers.get("ETag") or meta["etag"]
+    last_modified = (
+        response.headers.get("Last-Modified") or meta["last_modified"]
+    )
+    if response.status_code == 304 and cached is not None:
+        # unchanged upstream, only the freshness clock restarts
+        cache.put(key, None, etag, last_modified)
+        return json.loads(cached[1])
+    cache.put(key, response.content, etag, last_modified)
+    return response.json()
+
+
+def _request(
+    session: requests.Session,
+    req: HttpRequest,
+    headers: dict[str, str],
+    timeout: tuple[float, float],
+) -> requests.Response:
+    response = session.request(
+        req.method,
+        req.url,
+        params=req.params,
+        json=req.body,
+        headers={**(req.headers or {}), **headers},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    return response
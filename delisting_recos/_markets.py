@@ -0,0 +1,103 @@
+"""Disk cache of ccxt market metadata."""
+
+from __future__ import annotations
+
+__all__ = [
+    "MarketCache",
+]
+
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING
+from typing import Any
+
+import ccxt
+import ccxt.async_support as ccxt_async
+
+if TYPE_CHECKING:
+    from ._types import ExchangeName
+    from ._types import Symbol
+
+
+# ────────────────────────────────────────────────────────────────
+# public
+class MarketCache:
+    """Loads each exchange's markets at most once per ttl.
+
+    Markets are kept in memory and on disk, and ccxt instances are rebuilt
+    from them offline with set_markets. Safe to share between threads.
+    """
+
+    def __init__(
+        self, cache_dir: str = "ccxt_markets", ttl: float = 24 * 60 * 60
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self._markets: dict[ExchangeName, dict[Symbol, dict[str, Any]]] = {}
+        self._locks: dict[ExchangeName, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def markets(self, exch: ExchangeName) -> dict[Symbol, dict[str, Any]]:
+        with self._lock(exch):
+            if exch not in self._markets:
+                markets = self._read(exch)
+                if markets is None:
+                    api = getattr(ccxt, exch)()
+                    markets = api.load_markets()
+                    self._write(exch, markets)
+                self._markets[exch] = markets
+            return self._markets[exch]
+
+    def seed(
+        self, exch: ExchangeName, markets: dict[Symbol, dict[str, Any]]
+    ) -> None:
+        """Use `markets` for `exch`, e.g. synthetic ones, on disk too."""
+        with self._lock(exch):
+            self._write(exch, markets)
+            self._markets[exch] = markets
+
+    def api(
+        self, exch: ExchangeName, config: dict[str, Any] | None = None
+    ) -> ccxt.Exchange:
+        """Sync ccxt instance with markets already loaded."""
+        api = getattr(ccxt, exch)(config or {})
+        api.set_markets(self.markets(exch))
+        return api
+
+    def async_api(
+        self, exch: ExchangeName, config: dict[str, Any] | None = None
+    ) -> ccxt_async.Exchange:
+        """ccxt.async_support instance with markets already loaded."""
+        api = getattr(ccxt_async, exch)(config or {})
+        api.set_markets(self.markets(exch))
+        return api
+
+    # ────────────────────────────────────────────────────────────────
+    # private
+    def _lock(self, exch: ExchangeName) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(exch, threading.Lock())
+
+    def _fn(self, exch: ExchangeName) -> str:
+        return os.path.join(self.cache_dir, f"{exch}.json")
+
+    def _read(self, exch: ExchangeName) -> dict[Symbol, dict[str, Any]] | None:
+        try:
+            with open(self._fn(exch)) as f:
+                cached = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if time.time() - cached["time"] > self.ttl:
+            return None
+        return cached["markets"]
+
+    def _write(
+        self, exch: ExchangeName, markets: dict[Symbol, dict[str, Any]]
+    ) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_fn = self._fn(exch) + ".tmp"
+        with open(tmp_fn, "w") as f:
+            json.dump({"time": time.time(), "markets": markets}, f)
+        os.replace(tmp_fn, self._fn(exch))
@@ -0,0 +1,148 @@
+"""Compact, precompressed JSON outputs for the static site."""
+
+from __future__ import annotations
+
+__all__ = [
+    "to_columnar",
+    "write_compressed",
+    "write_manifest",
+    "write_shards",
+]
+
+import gzip
+import hashlib
+import json
+import os
+import zlib
+from collections.abc import Iterable
+from typing import Any
+
+import pandas as pd
+
+try:
+    import brotli
+except ImportError:  # the .br variants are skipped without it
+    brotli = None
+
+# hex digits of the content hash in shard file names
+HASH_CHARS: int = 12
+
+
+# ────────────────────────────────────────────────────────────────
+# public
+def to_columnar(
+    frame: pd.DataFrame,
+    meta: dict[str, Any],
+    dictionary: Iterable[str] = (),
+) -> dict[str, Any]:
+    """`frame` as a JSON-ready document of column arrays.
+
+    Column names are listed once under "columns" and "data" holds one value
+    array per column in the same order. Each column in `dictionary` is
+    stored as integer codes into its labels under "dictionaries", so a
+    repeated string like a recommendation costs a digit per row. Missing
+    values are null.
+    """
+    dictionary = set(dictionary)
+    data: list[list[Any]] = []
+    dictionaries: dict[str, list[Any]] = {}
+    for name, column in frame.items():
+        if name in dictionary:
+            codes = pd.Categorical(column)
+            dictionaries[str(name)] = codes.categories.tolist()
+            data.append([c if c >= 0 else None for c in codes.codes.tolist()])
+        elif column.hasnans:
+            # nan is not JSON, so missing values become null
+            data.append(
+                column.astype(object).where(column.notna(), None).tolist()
+            )
+        else:
+            data.append(column.tolist())
+    return {
+        "meta": {**meta, "rows": len(frame)},
+        "columns": [str(name) for name in frame.columns],
+        "dictionaries": dictionaries,
+        "data": data,
+    }
+
+
+def write_compressed(path: str, text: str) -> list[str]:
+    """Write `text` to `path` plus its .gz and, with brotli, .br variants.
+
+    The variants are compressed at the highest level, once per build, so
+    a server or CDN can hand them out as is. Returns the paths written.
+    """
+    raw = text.encode()
+    # mtime=0 keeps the .gz byte-identical while the text is unchanged
+    variants = {path: raw, f"{path}.gz": gzip.compress(raw, 9, mtime=0)}
+    if brotli is not None:
+        variants[f"{path}.br"] = brotli.compress(raw, quality=11)
+    for fn, content in variants.items():
+        with open(fn, "wb") as f:
+            f.write(content)
+    return list(variants)
+
+
+def write_shards(
+    frame: pd.DataFrame,
+    directory: str,
+    key: str,
+    n_shards: int,
+    dictionary: Iterable[str] = (),
+) -> pd.Series:
+    """Split `frame` into `n_shards` columnar files named by their content.
+
+    A row goes to shard crc32(`key`) % `n_shards`, so a coin keeps its
+    shard from run to run, and each shard is written compressed as
+    "<directory>/<shard>.<sha256 prefix>.json". An unchanged shard keeps
+    its name, which lets a CDN cache every shard forever.
+
+    Returns the path of each row's shard.
+    """
+    os.makedirs(directory, exist_ok=True)
+    shards = frame[key].astype(str).map(
+        lambda k: zlib.crc32(k.encode()) % n_shards
+    )
+    paths: dict[int, str] = {}
+    for shard, rows in frame.groupby(shards, sort=True):
+        text = json.dumps(
+            to_columnar(rows, {}, dictionary), separators=(",", ":")
+        )
+        digest = hashlib.sha256(text.encode()).hexdigest()[:HASH_CHARS]
+        paths[shard] = f"{directory}/{shard}.{digest}.json"
+        if not os.path.exists(paths[shard]):
+            write_compressed(paths[shard], text)
+    return shards.map(paths)
+
+
+def write_manifest(
+    path: str, files: Iterable[str], directory: str
+) -> dict[str, Any]:
+    """Write the sha256 and size of every one of `files` to `path`.
+
+    Files in `directory` listed neither here nor in the manifest being
+    replaced are deleted, so a page still holding the previous index can
+    load its shards while older ones are cleaned up.
+    """
+    previous: set[str] = set()
+    if os.path.exists(path):
+        with open(path) as f:
+            previous = set(json.load(f)["files"])
+
+    manifest: dict[str, Any] = {"files": {}}
+    for fn in files:
+        with open(fn, "rb") as f:
+            content = f.read()
+        manifest["files"][fn] = {
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "bytes": len(content),
+        }
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=1)
+
+    keep = previous | set(manifest["files"])
+    for fn in os.listdir(directory):
+        stem = fn.removesuffix(".gz").removesuffix(".br")
+        if f"{directory}/{stem}" not in keep:
+            os.remove(os.path.join(directory, fn))
+    return manifest
@@ -0,0 +1,191 @@
+"""Threshold scoring of metrics against compiled cutoffs."""
+
+from __future__ import annotations
+
+__all__ = [
+    "RECOMMENDATIONS",
+    "ThresholdScorer",
+    "as_float",
+    "compile_cutoffs",
+    "recommend",
+    "recommendation_codes",
+    "tier_bounds",
+]
+
+from collections.abc import Mapping
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from ._types import CatLabel
+from ._types import CutoffSpec
+
+RECOMMENDATIONS: list[str] = ["", "Dec. Lev.", "Delist", "List", "Inc. Lev."]
+
+
+# ────────────────────────────────────────────────────────────────
+# public
+class ThresholdScorer:
+    """Scores metric columns against per-variable threshold cutoffs.
+
+    The cutoffs of every variable are compiled once into sorted edges and
+    the score each edge awards, so scoring a variable is one
+    `np.searchsorted` over its column however many rows there are.
+    """
+
+    def __init__(
+        self, cutoffs: dict[str, dict[CatLabel, CutoffSpec]]
+    ) -> None:
+        self.categories: dict[str, list[CatLabel]] = {
+            category: list(specs) for category, specs in cutoffs.items()
+        }
+        self.variables: list[CatLabel] = [
+            var for specs in cutoffs.values() for var in specs
+        ]
+        self._reverse = [
+            spec["kind"] == "reverse_linear"
+            for specs in cutoffs.values()
+            for spec in specs.values()
+        ]
+        self._edges, self._values = zip(
+            *(
+                compile_cutoffs(spec)
+                for specs in cutoffs.values()
+                for spec in specs.values()
+            )
+        )
+
+    def partial_scores(self, frame: Mapping[str, Any]) -> np.ndarray:
+        """(rows, variables) int scores of the columns in `frame`."""
+        columns = [as_float(frame[var]) for var in self.variables]
+        out = np.zeros((len(columns[0]), len(columns)), dtype=np.int64)
+        for i, x in enumerate(columns):
+            out[:, i] = _score(
+                x, self._edges[i], self._values[i], self._reverse[i]
+            )
+        return out
+
+    def score(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Each category's total followed by its partial scores.
+
+        Partial scores are named `Partial_Score_<variable>`.
+        """
+        partial = self.partial_scores(frame)
+        output: dict[str, np.ndarray] = {}
+        i = 0
+        for category, variables in self.categories.items():
+            n = len(variables)
+            output[category] = partial[:, i : i + n].sum(axis=1)
+            for j, var in enumerate(variables):
+                output["Partial_Score_" + var] = partial[:, i + j]
+            i += n
+        return pd.DataFrame(output, index=frame.index)
+
+
+def as_float(column: Any) -> np.ndarray:
+    """`column` as a float array, with missing values as nan."""
+    if isinstance(column, pd.Series):
+        return column.to_numpy(dtype=float, na_value=np.nan)
+    return np.asarray(column, dtype=float)
+
+
+def compile_cutoffs(spec: CutoffSpec) -> tuple[np.ndarray, np.ndarray]:
+    """Ascending threshold edges of a variable and the score of each.
+
+    An `exp` or `linear` variable scores the value of the highest edge at
+    or below it, a `reverse_linear` one the value of the lowest edge at or
+    above it. Either scores 0 when no edge qualifies or it is missing.
+    """
+    start, end, steps = spec["start"], spec["end"], spec["steps"]
+    if spec["kind"] == "exp":
+        points = {
+            start * (end / start) ** (k / steps): k for k in range(steps + 1)
+        }
+    elif spec["kind"] in ("linear", "reverse_linear"):
+        points = {
+            start + (end - start) * (k / steps): k for k in range(steps + 1)
+        }
+    else:
+        raise ValueError(f"Unknown cutoff kind {spec['kind']!r}")
+    edges = sorted(points)
+    return np.array(edges), np.array([points[e] for e in edges])
+
+
+def recommend(
+    score: Any,
+    max_lev: Any,
+    score_lb: dict[int, float],
+    score_ub: dict[int, float],
+) -> pd.Categorical:
+    """Recommendation of every coin from its score and current leverage.
+
+    Leverages are bucketed into the `score_lb`/`score_ub` tiers, capped at
+    the highest tier. Coins scoring below their lower bound have their
+    leverage decreased, or are delisted at 3x; coins scoring at or above
+    their upper bound are listed, or have their leverage increased.
+    """
+    max_lev = as_float(max_lev)
+    codes = recommendation_codes(
+        as_float(score),
+        max_lev,
+        tier_bounds(score_lb, max_lev),
+        tier_bounds(score_ub, max_lev),
+    )
+    return pd.Categorical.from_codes(codes, RECOMMENDATIONS)
+
+
+def recommendation_codes(
+    score: np.ndarray,
+    max_lev: np.ndarray,
+    lower: np.ndarray,
+    upper: np.ndarray,
+) -> np.ndarray:
+    """Codes into RECOMMENDATIONS; all arguments broadcast together."""
+    high_lev = score < lower
+    low_lev = score >= upper
+    return np.select(
+        [
+            (max_lev > 3) & high_lev,
+            (max_lev == 3) & high_lev,
+            (max_lev == 0) & low_lev,
+            (max_lev > 0) & low_lev,
+        ],
+        [1, 2, 3, 4],
+        default=0,
+    ).astype(np.int8)
+
+
+def tier_bounds(tiers: dict[int, float], lev: np.ndarray) -> np.ndarray:
+    """The bound of each leverage's tier in `tiers`.
+
+    Leverages are truncated to integers and capped at the highest tier. A
+    leverage without a tier raises KeyError, a nan one ValueError.
+    """
+    if np.isnan(lev).any():
+        raise ValueError("Leverage must not be nan")
+    keys = np.array(sorted(tiers))
+    bounds = np.array([tiers[k] for k in keys], dtype=float)
+    # leverage is truncated like int() before being capped at the top tier
+    tier = np.minimum(keys[-1], lev.astype(np.int64))
+    pos = np.minimum(np.searchsorted(keys, tier), len(keys) - 1)
+    missing = keys[pos] != tier
+    if missing.any():
+        raise KeyError(int(tier[missing][0]))
+    return bounds[pos]
+
+
+# ────────────────────────────────────────────────────────────────
+# private
+def _score(
+    x: np.ndarray, edges: np.ndarray, values: np.ndarray, reverse: bool
+) -> np.ndarray:
+    # nan sorts past the last edge, so it is masked out explicitly
+    if reverse:
+        idx = np.searchsorted(edges, x, side="left")
+        hit = idx < len(edges)
+    else:
+        idx = np.searchsorted(edges, x, side="right") - 1
+        hit = idx >= 0
+    hit &= ~np.isnan(x)
+    return np.where(hit, values[np.clip(idx, 0, len(edges) - 1)], 0)
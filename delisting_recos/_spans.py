@@ -0,0 +1,214 @@
+"""Timing, memory and HTTP instrumentation of pipeline spans."""
+
+from __future__ import annotations
+
+__all__ = [
+    "Span",
+    "Tracer",
+]
+
+import contextvars
+import datetime
+import json
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import fields
+from typing import Any
+
+import pandas as pd
+import requests
+
+try:
+    import resource
+except ImportError:  # not on Windows, where psutil is tried instead
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# ────────────────────────────────────────────────────────────────
+# public
+@dataclass
+class Span:
+    """One timed section of a run, e.g. a stage or an exchange within one.
+
+    Times are in seconds. CPU time is the whole process's while the span
+    was open, so spans running concurrently share it. Peak RSS is the
+    process's high-water mark when the span closed, nan where it cannot
+    be read. HTTP counters include every nested span's requests.
+    """
+
+    name: str
+    path: str
+    depth: int
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    peak_rss_mb: float = float("nan")
+    rows_in: int | None = None
+    rows_out: int | None = None
+    http_requests: int = 0
+    http_bytes: int = 0
+    parent: Span | None = field(default=None, repr=False)
+
+    def record_rows(self, inputs: Any = None, output: Any = None) -> None:
+        """Rows of the frames going in and out, summed through dicts."""
+        self.rows_in = _count_rows(inputs)
+        self.rows_out = _count_rows(output)
+
+
+class Tracer:
+    """Records nested spans and writes them as a run report.
+
+    The current span is tracked per context, so spans opened by concurrent
+    asyncio tasks nest under the span that started the tasks. Sessions and
+    ccxt exchanges instrumented inside a span count their requests and
+    response bytes towards it. Safe to share between threads.
+    """
+
+    def __init__(self) -> None:
+        self.started = datetime.datetime.now()
+        self.spans: list[Span] = []
+        self._current: contextvars.ContextVar[Span | None] = (
+            contextvars.ContextVar("span", default=None)
+        )
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[Span]:
+        parent = self._current.get()
+        span = Span(
+            name,
+            f"{parent.path}/{name}" if parent else name,
+            parent.depth + 1 if parent else 0,
+            parent=parent,
+        )
+        with self._lock:
+            self.spans.append(span)
+        token = self._current.set(span)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield span
+        finally:
+            span.wall_s = time.perf_counter() - wall
+            span.cpu_s = time.process_time() - cpu
+            span.peak_rss_mb = _peak_rss_mb()
+            self._current.reset(token)
+
+    def instrument_session(
+        self, session: requests.Session
+    ) -> requests.Session:
+        """Count the responses of `session` towards the current span."""
+        span = self._current.get()
+
+        def count(response: requests.Response, *args, **kwargs) -> None:
+            self._count(span, len(response.content))
+
+        session.hooks["response"].append(count)
+        return session
+
+    def instrument_exchange(self, api: Any) -> Any:
+        """Count the REST calls of a ccxt async exchange towards the span.
+
+        Bytes are read from `last_http_response`, so they are approximate
+        while requests on the same exchange overlap.
+        """
+        span = self._current.get()
+        fetch = api.fetch
+
+        async def counted_fetch(*args, **kwargs) -> Any:
+            response = await fetch(*args, **kwargs)
+            self._count(span, len(api.last_http_response or ""))
+            return response
+
+        api.fetch = counted_fetch
+        return api
+
+    def report(self) -> dict[str, Any]:
+        spans = [
+            {
+                f.name: getattr(span, f.name)
+                for f in fields(Span)
+                if f.name != "parent"
+            }
+            for span in self.spans
+        ]
+        return {"started": self.started.isoformat(), "spans": spans}
+
+    def write_report(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=1)
+
+    def summary(self, previous: dict[str, Any] | None = None) -> str:
+        """A table of every span, indented by nesting.
+
+        Given the `previous` run's report, the change in wall time of every
+        span since then is shown too.
+        """
+        before = {
+            span["path"]: span["wall_s"]
+            for span in (previous or {}).get("spans", [])
+        }
+        table = pd.DataFrame(
+            {
+                "wall s": [s.wall_s for s in self.spans],
+                "vs last": [
+                    s.wall_s - before.get(s.path, float("nan"))
+                    for s in self.spans
+                ],
+                "cpu s": [s.cpu_s for s in self.spans],
+                "peak RSS MB": [s.peak_rss_mb for s in self.spans],
+                "rows in": [_blank_none(s.rows_in) for s in self.spans],
+                "rows out": [_blank_none(s.rows_out) for s in self.spans],
+                "requests": [s.http_requests for s in self.spans],
+                "MB in": [s.http_bytes / 1e6 for s in self.spans],
+            },
+            index=pd.Index(
+                ["  " * s.depth + s.name for s in self.spans], name="span"
+            ),
+        )
+        if previous is None:
+            table = table.drop(columns="vs last")
+        return table.to_string(float_format="{:.2f}".format, na_rep="")
+
+    # ────────────────────────────────────────────────────────────────
+    # private
+    def _count(self, span: Span | None, n_bytes: int) -> None:
+        with self._lock:
+            while span is not None:
+                span.http_requests += 1
+                span.http_bytes += n_bytes
+                span = span.parent
+
+
+# ────────────────────────────────────────────────────────────────
+# private
+def _count_rows(obj: Any) -> int | None:
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj)
+    if isinstance(obj, dict):
+        counts = [_count_rows(v) for v in obj.values()]
+        counts = [c for c in counts if c is not None]
+        return sum(counts) if counts else None
+    return None
+
+
+def _blank_none(count: int | None) -> str:
+    return "" if count is None else str(count)
+
+
+def _peak_rss_mb() -> float:
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # bytes on macOS, kB elsewhere
+        return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1 << 20)
+    return float("nan")
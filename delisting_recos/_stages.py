@@ -0,0 +1,141 @@
+"""Named pipeline stages with an on-disk cache of their outputs."""
+
+from __future__ import annotations
+
+__all__ = [
+    "StageCache",
+]
+
+import hashlib
+import inspect
+import os
+import pickle
+from collections.abc import Callable
+from collections.abc import Iterable
+from types import ModuleType
+from typing import Any
+
+
+# ────────────────────────────────────────────────────────────────
+# public
+class StageCache:
+    """Runs pipeline stages, reusing their pickled output when possible.
+
+    A stage is keyed by the source of its code, its config and the output
+    hashes of the stages it consumes. When the key matches the one stored
+    next to the cached output, the stage is not run again. Stages in
+    `force` always run; stages in `skip` reuse whatever was cached last.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = ".recos_cache",
+        force: Iterable[str] = (),
+        skip: Iterable[str] = (),
+    ) -> None:
+        self.cache_dir = cache_dir
+        self.force = set(force)
+        self.skip = set(skip)
+        self.outputs: dict[str, Any] = {}
+        self._hashes: dict[str, str] = {}
+
+    def run(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        *deps: str,
+        code: Iterable[Callable[..., Any]] = (),
+        modules: Iterable[ModuleType] = (),
+        config: Any = None,
+    ) -> Any:
+        """Run `fn` on the outputs of the `deps` stages, or reuse its cache.
+
+        `code` lists helpers whose source should invalidate the cache too.
+        Any change to the source of `modules`, every file of a package,
+        invalidates it as well, so helpers missing from `code` are covered.
+        """
+        key = _sha256(
+            name,
+            *(inspect.getsource(f) for f in (fn, *code)),
+            *(src for module in modules for src in _module_sources(module)),
+            repr(config),
+            *(self._hashes[dep] for dep in deps),
+        )
+        cached = self._read(name)
+
+        if name in self.skip and cached is None:
+            raise RuntimeError(f"No cached output to skip stage {name}")
+        if name not in self.skip and (
+            name in self.force or cached is None or cached["key"] != key
+        ):
+            output = fn(*(self.outputs[dep] for dep in deps))
+            pickled = pickle.dumps(output, protocol=pickle.HIGHEST_PROTOCOL)
+            cached = {"key": key, "output_hash": _sha256(pickled)}
+            self._write(name, cached, pickled)
+        else:
+            output = self._read(name, with_output=True)["output"]
+
+        self.outputs[name] = output
+        self._hashes[name] = cached["output_hash"]
+        return output
+
+    def load(self, name: str) -> Any:
+        """The cached output of a stage, without running anything."""
+        cached = self._read(name, with_output=True)
+        if cached is None:
+            raise RuntimeError(f"No cached output for stage {name}")
+        return cached["output"]
+
+    # ────────────────────────────────────────────────────────────────
+    # private
+    def _fn(self, name: str) -> str:
+        return os.path.join(self.cache_dir, f"{name}.pkl")
+
+    def _read(
+        self, name: str, with_output: bool = False
+    ) -> dict[str, Any] | None:
+        """The pickled cache header, which the pickled output follows."""
+        try:
+            with open(self._fn(name), "rb") as f:
+                cached = pickle.load(f)
+                if with_output:
+                    cached["output"] = pickle.load(f)
+        except (FileNotFoundError, pickle.UnpicklingError, EOFError):
+            return None
+        return cached
+
+    def _write(
+        self, name: str, cached: dict[str, Any], pickled: bytes
+    ) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self._fn(name) + ".tmp", "wb") as f:
+            pickle.dump(cached, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.write(pickled)
+        os.replace(self._fn(name) + ".tmp", self._fn(name))
+
+
+def _module_sources(module: ModuleType) -> list[bytes]:
+    """The source files of `module`, or of every module in a package."""
+    if not hasattr(module, "__path__"):
+        fns = [inspect.getsourcefile(module)]
+    else:
+        fns = sorted(
+            os.path.join(root, fn)
+            for path in module.__path__
+            for root, _, files in os.walk(path)
+            for fn in files
+            if fn.endswith(".py")
+        )
+    sources = []
+    for fn in fns:
+        with open(fn, "rb") as f:
+            sources.append(f.read())
+    return sources
+
+
+def _sha256(*parts: str | bytes) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode() if isinstance(part, str) else part)
+        h.update(b"\0")
+    return h.hexdigest()
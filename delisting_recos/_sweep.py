@@ -0,0 +1,185 @@
+"""Rescoring a frame under many candidate scoring configs at once."""
+
+from __future__ import annotations
+
+__all__ = [
+    "ScoreConfig",
+    "sweep",
+]
+
+import os
+from collections.abc import Collection
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from ._scoring import RECOMMENDATIONS
+from ._scoring import as_float
+from ._scoring import compile_cutoffs
+from ._scoring import recommendation_codes
+from ._scoring import tier_bounds
+from ._types import CatLabel
+from ._types import Coin
+from ._types import CutoffSpec
+
+# configs scored per numpy pass, bounding the (coins, configs, variables,
+# edges) comparison to a few tens of MB
+CHUNK_SIZE: int = 64
+# below this many configs a process pool costs more than it saves
+MIN_PARALLEL_CONFIGS: int = 512
+
+
+# ────────────────────────────────────────────────────────────────
+# public
+@dataclass(frozen=True)
+class ScoreConfig:
+    """The tunable parameters of `build_scores` and the recommendations.
+
+    Configs swept together must score the same variables under the same
+    categories; only their thresholds and bounds may differ.
+    """
+
+    cutoffs: dict[str, dict[CatLabel, CutoffSpec]]
+    score_lb: dict[int, float]
+    score_ub: dict[int, float]
+    strict_boost: float
+    non_hl_boost: float
+
+
+def sweep(
+    frame: pd.DataFrame,
+    configs: Sequence[ScoreConfig],
+    baseline: ScoreConfig,
+    strict: Collection[Coin],
+    boost_categories: list[str],
+    processes: int | None = None,
+) -> pd.DataFrame:
+    """How the recommendations of `frame` change under each config.
+
+    `frame` is the merged frame `build_scores` consumes, indexed by coin.
+    Coins not listed on HL get their HL categories zeroed and a
+    `non_hl_boost` share of the `boost_categories` scores, and coins in
+    `strict` get `strict_boost`, exactly as in `build_scores`.
+
+    Every config is scored as one (coins, configs, variables) array
+    computation. Large sweeps are split across `processes` worker
+    processes, all cores by default.
+
+    Returns one row per config: the number of coins per recommendation,
+    the number of coins whose recommendation differs from `baseline`,
+    and, per recommendation, how many of those flipped to it.
+    """
+    categories = {c: list(v) for c, v in baseline.cutoffs.items()}
+    for config in configs:
+        if {c: list(v) for c, v in config.cutoffs.items()} != categories:
+            raise ValueError("Configs must share categories and variables")
+
+    variables = [v for vs in categories.values() for v in vs]
+    x = np.stack([as_float(frame[v]) for v in variables], axis=1)
+    max_lev = as_float(frame["Max Lev. on HL"])
+    is_strict = frame.index.isin(list(strict))
+    args = (x, max_lev, is_strict, categories, boost_categories)
+
+    base_codes = _score_chunk(*args, [baseline])[:, 0]
+    chunks = [
+        list(configs[i : i + CHUNK_SIZE])
+        for i in range(0, len(configs), CHUNK_SIZE)
+    ]
+    processes = processes or os.cpu_count() or 1
+    if processes > 1 and len(configs) >= MIN_PARALLEL_CONFIGS:
+        with ProcessPoolExecutor(processes) as pool:
+            parts = list(pool.map(partial(_score_chunk, *args), chunks))
+    else:
+        parts = [_score_chunk(*args, c) for c in chunks]
+    codes = np.concatenate(parts, axis=1) if parts else base_codes[:, :0]
+
+    names = [label or "Keep" for label in RECOMMENDATIONS]
+    flipped = codes != base_codes[:, None]
+    table = {
+        name: (codes == i).sum(axis=0) for i, name in enumerate(names)
+    }
+    table["flipped"] = flipped.sum(axis=0)
+    for i, name in enumerate(names):
+        table[f"to {name}"] = (flipped & (codes == i)).sum(axis=0)
+    return pd.DataFrame(
+        table, index=pd.RangeIndex(len(configs), name="config")
+    )
+
+
+# ────────────────────────────────────────────────────────────────
+# private
+def _score_chunk(
+    x: np.ndarray,
+    max_lev: np.ndarray,
+    is_strict: np.ndarray,
+    categories: dict[str, list[CatLabel]],
+    boost_categories: list[str],
+    configs: list[ScoreConfig],
+) -> np.ndarray:
+    """(coins, configs) recommendation codes."""
+    edges, values, sign = _compile(configs, categories)
+
+    # reverse_linear variables take the lowest edge at or above them, which
+    # after negating both sides is the highest edge at or below, like the rest
+    xs = x[:, None, :] * sign
+    idx = (xs[..., None] >= edges).sum(axis=-1) - 1
+    scores = np.take_along_axis(
+        np.broadcast_to(values, (len(x), *values.shape)),
+        np.maximum(idx, 0)[..., None],
+        axis=-1,
+    )[..., 0]
+    scores = np.where((idx >= 0) & ~np.isnan(xs), scores, 0)
+
+    membership = np.zeros((scores.shape[-1], len(categories)), dtype=int)
+    j = 0
+    for k, variables in enumerate(categories.values()):
+        membership[j : j + len(variables), k] = 1
+        j += len(variables)
+    totals = scores @ membership
+
+    unlisted = (max_lev < 1)[:, None]
+    names = list(categories)
+    hl = np.array(["HL" in name for name in names])
+    totals = np.where(unlisted[..., None] & hl, 0, totals)
+    boosted = totals[..., [names.index(c) for c in boost_categories]]
+    boost = np.array([c.non_hl_boost for c in configs])
+    non_hl = (boost * unlisted * boosted.sum(axis=-1)).astype(np.int64)
+    strict_boost = np.array([c.strict_boost for c in configs])
+    score = (
+        totals.sum(axis=-1) + non_hl + is_strict[:, None] * strict_boost
+    )
+
+    lower = np.stack([tier_bounds(c.score_lb, max_lev) for c in configs], 1)
+    upper = np.stack([tier_bounds(c.score_ub, max_lev) for c in configs], 1)
+    return recommendation_codes(score, max_lev[:, None], lower, upper)
+
+
+def _compile(
+    configs: list[ScoreConfig], categories: dict[str, list[CatLabel]]
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Nan-padded (configs, variables, edges) edges and their values.
+
+    Also returns the (configs, variables) sign that turns the edges of
+    every kind into lower bounds.
+    """
+    specs = [
+        [c.cutoffs[cat][var] for cat, vs in categories.items() for var in vs]
+        for c in configs
+    ]
+    compiled = [[compile_cutoffs(spec) for spec in row] for row in specs]
+    width = max(len(e) for row in compiled for e, _ in row)
+    shape = (len(configs), len(specs[0]), width)
+    edges = np.full(shape, np.nan)
+    values = np.zeros(shape, dtype=np.int64)
+    sign = np.ones(shape[:2])
+    for i, row in enumerate(compiled):
+        for j, (e, v) in enumerate(row):
+            if specs[i][j]["kind"] == "reverse_linear":
+                e, v, sign[i, j] = -e[::-1], v[::-1], -1
+            edges[i, j, : len(e)] = e
+            values[i, j, : len(v)] = v
+    return edges, values, sign
@@ -0,0 +1,117 @@
+"""Normalization of exchange market symbols to canonical coins."""
+
+from __future__ import annotations
+
+__all__ = [
+    "SymbolNormalizer",
+]
+
+import threading
+from collections.abc import Iterable
+from itertools import islice
+
+import pandas as pd
+
+from ._types import Coin
+from ._types import ExchangeName
+from ._types import Symbol
+
+
+# ────────────────────────────────────────────────────────────────
+# public
+class SymbolNormalizer:
+    """Maps market symbols like "1000PEPE/USDT:USDT" to coins like "PEPE".
+
+    The base currency is stripped of every `suffixes` entry in turn, then
+    mapped through the per-exchange and global aliases. Results are kept
+    in a memo of at most `maxsize` (symbol, exchange) pairs, and every
+    symbol seen is recorded in a reverse index from coin to symbols.
+    Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        suffixes: list[str],
+        aliases: dict[Coin, Coin],
+        exch_aliases: dict[tuple[Coin, ExchangeName], Coin],
+        maxsize: int = 1 << 16,
+    ) -> None:
+        self.suffixes = suffixes
+        self.aliases = aliases
+        self.exch_aliases = exch_aliases
+        self.maxsize = maxsize
+        self._memo: dict[tuple[Symbol, ExchangeName], Coin] = {}
+        self._symbols: dict[Coin, dict[ExchangeName, set[Symbol]]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, symbol: Symbol, exch: ExchangeName = "") -> Coin:
+        coin = self._memo.get((symbol, exch))
+        if coin is None:
+            coin = self.normalize_many([symbol], exch)[0]
+        return coin
+
+    def normalize_many(
+        self, symbols: Iterable[Symbol], exch: ExchangeName = ""
+    ) -> list[Coin]:
+        """Coins of many symbols of one exchange, resolved as one batch.
+
+        Only symbols missing from the memo are normalized, with one
+        vectorized string operation per suffix.
+        """
+        symbols = list(symbols)
+        with self._lock:
+            known = {s: self._memo.get((s, exch)) for s in symbols}
+            missing = [s for s, coin in known.items() if coin is None]
+            if missing:
+                coins = self._resolve(missing, exch).tolist()
+                known.update(zip(missing, coins))
+                self._store(missing, coins, exch)
+            return [known[s] for s in symbols]
+
+    def symbols_of(self, coin: Coin) -> dict[ExchangeName, set[Symbol]]:
+        """Every symbol normalized to `coin` so far, per exchange.
+
+        Symbols without an exchange, e.g. from CoinMarketCap, are under "".
+        """
+        with self._lock:
+            return {
+                exch: set(symbols)
+                for exch, symbols in self._symbols.get(coin, {}).items()
+            }
+
+    def coins(self) -> list[Coin]:
+        """Every coin normalized to so far."""
+        with self._lock:
+            return list(self._symbols)
+
+    # ────────────────────────────────────────────────────────────────
+    # private
+    def _resolve(
+        self, symbols: list[Symbol], exch: ExchangeName
+    ) -> pd.Series:
+        bases = pd.Series(symbols, dtype=object).str.split("/", n=1).str[0]
+        for suffix in self.suffixes:
+            bases = bases.str.replace(suffix, "", regex=False)
+        exch_aliases = {
+            coin: alias
+            for (coin, alias_exch), alias in self.exch_aliases.items()
+            if alias_exch == exch
+        }
+        bases = bases.map(lambda b: exch_aliases.get(b, b))
+        return bases.map(lambda b: self.aliases.get(b, b))
+
+    def _store(
+        self, symbols: list[Symbol], coins: list[Coin], exch: ExchangeName
+    ) -> None:
+        for symbol, coin in zip(symbols, coins):
+            self._symbols.setdefault(coin, {}).setdefault(exch, set()).add(
+                symbol
+            )
+        pairs = list(zip(symbols, coins))[-self.maxsize :]
+        overflow = len(self._memo) + len(pairs) - self.maxsize
+        if overflow > 0:
+            # the oldest entries go first
+            for key in list(islice(self._memo, overflow)):
+                del self._memo[key]
+        for symbol, coin in pairs:
+            self._memo[symbol, exch] = coin
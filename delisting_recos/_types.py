@@ -0,0 +1,35 @@
+"""Types shared by the delisting recommendation build."""
+
+from __future__ import annotations
+
+__all__ = [
+    "Candle",
+    "CatLabel",
+    "Coin",
+    "CutoffSpec",
+    "ExchangeName",
+    "SpotFut",
+    "Symbol",
+]
+
+from typing import Literal
+from typing import TypedDict
+
+type Coin = str
+type ExchangeName = str
+type Symbol = str
+type SpotFut = Literal["spot", "futures"]
+
+# [timestamp ms, open, high, low, close, volume], as returned by ccxt
+type Candle = list[float]
+
+type CatLabel = str
+
+
+class CutoffSpec(TypedDict):
+    """`steps + 1` thresholds from `start` to `end`, scored 0 to `steps`."""
+
+    kind: Literal["exp", "linear", "reverse_linear"]
+    start: float
+    end: float
+    steps: int
@@ -0,0 +1,367 @@
+"""Benchmarks of the processing stages on synthetic data.
+
+Run from the repository root, where build_delisting_recos.py lives:
+
+    python -m delisting_recos.bench --markets 500 5000 50000
+
+Every scale gets fresh synthetic candle stores, ccxt markets, Hyperliquid
+metaAndAssetCtxs, Thunderhead charts and CoinMarketCap listings in a
+temporary directory, so nothing is downloaded. The build module's market
+cache is replaced per scale and its symbol normalizer per repeat, so no
+run is sped up by another's memo. Each step is timed best of `--repeat`,
+and the timings are appended to `--results` with the current commit. A
+step slower than the last stored run at the same scale by more than
+`--threshold` is a regression, and the exit status is 1.
+"""
+
+from __future__ import annotations
+
+__all__ = [
+    "STEPS",
+    "compare",
+    "main",
+    "run",
+    "write_fixtures",
+]
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from ._asof import DAY_MS
+from ._candles import CandleStore
+from ._markets import MarketCache
+from ._symbols import SymbolNormalizer
+
+# the timed steps, in pipeline order
+STEPS: list[str] = [
+    "process_reference_exch_data",
+    "process_reference_exch_windows",
+    "process_thunderhead_data",
+    "build_scores",
+    "generate_recommendations",
+    "render_outputs",
+]
+RESULTS_JSON: str = "bench_results.json"
+# step time differences below this many seconds are noise, not regressions
+MIN_REGRESSION_S: float = 0.02
+
+
+# ────────────────────────────────────────────────────────────────
+# public
+def write_fixtures(
+    recos: Any, n_markets: int, days: int, seed: int = 0
+) -> dict[str, Any]:
+    """Synthetic inputs for about `n_markets` markets, written to the cwd.
+
+    Candle stores are written, and the `MARKET_CACHE` seeded with ccxt
+    markets, for every `REFERENCE_EXCH` entry of the `recos` build module,
+    each listing a random subset of a shared coin universe over the last
+    `days` days. Returns the raw "hl", "thunderhead" and "cmc" data, shaped
+    like `dl_api_data` output.
+    """
+    rng = np.random.default_rng(seed)
+    pairs = [
+        (exch, spot_fut)
+        for exch, exch_spec in recos.REFERENCE_EXCH.items()
+        for spot_fut in exch_spec
+    ]
+    per_pair = max(1, n_markets // len(pairs))
+    coins = [f"C{i}" for i in range(max(50, per_pair * 5 // 4))]
+    today = int(time.time() * 1000) // DAY_MS * DAY_MS
+    t = today - np.arange(days - 1, -1, -1) * DAY_MS
+
+    markets: dict[str, dict[str, dict[str, Any]]] = {}
+    for exch, spot_fut in pairs:
+        listed = rng.choice(len(coins), per_pair, replace=False)
+        quote = "USDT:USDT" if spot_fut == "futures" else "USDT"
+        symbols = [f"{coins[i]}/{quote}" for i in listed]
+        markets.setdefault(exch, {}).update(
+            {s: {"contractSize": 1 if ":" in s else None} for s in symbols}
+        )
+        close = rng.lognormal(0, 2, (per_pair, 1)) * np.exp(
+            np.cumsum(rng.normal(0, 0.05, (per_pair, days)), axis=1)
+        )
+        data = np.stack(
+            [
+                np.broadcast_to(t, close.shape),
+                close,
+                close * 1.04,
+                close * 0.96,
+                close,
+                rng.lognormal(12, 3, close.shape),
+            ]
+        ).reshape(6, -1)
+        offsets = {
+            s: (i * days, (i + 1) * days) for i, s in enumerate(symbols)
+        }
+        CandleStore(recos.get_fn(exch, spot_fut), data, offsets).save()
+    for exch, exch_markets in markets.items():
+        recos.MARKET_CACHE.seed(exch, exch_markets)
+
+    # about half the universe is listed on Hyperliquid, a few delisted
+    hl_coins = coins[::2]
+    universe = [
+        {
+            "name": c,
+            "maxLeverage": int(rng.choice([3, 5, 10, 20, 40])),
+            "isDelisted": True if i % 40 == 0 else None,
+        }
+        for i, c in enumerate(hl_coins)
+    ]
+    asset_ctxs = [
+        {"funding": "0.0001", "openInterest": str(rng.random() * 1e6)}
+        for _ in hl_coins
+    ]
+
+    times = pd.to_datetime(t, unit="ms").strftime("%Y-%m-%dT%H:%M:%S")
+
+    def chart(value: str, mean: float) -> list[dict[str, Any]]:
+        values = rng.lognormal(mean, 2, (len(times), len(hl_coins)))
+        return [
+            {"time": day, "coin": coin, value: float(v)}
+            for day, row in zip(times, values.tolist())
+            for coin, v in zip(hl_coins, row)
+        ]
+
+    prices = chart("avg_oracle_px", 0)
+    for entry, oi in zip(prices, chart("avg_open_interest", 10)):
+        entry["avg_open_interest"] = oi["avg_open_interest"]
+    liquidity: dict[str, list[dict[str, Any]]] = {}
+    for entry in chart("median_slippage_3000", -8):
+        liquidity.setdefault(entry["coin"], []).append(
+            {
+                "time": entry["time"],
+                "median_slippage_3000": entry["median_slippage_3000"],
+                "median_slippage_30000": entry["median_slippage_3000"] * 5,
+            }
+        )
+    thunderhead = {
+        "daily_usd_volume_by_coin": chart("daily_usd_volume", 14),
+        "total_volume": chart("total_volume", 14),
+        "asset_ctxs": prices,
+        "hlp_positions": chart("daily_ntl_abs", 10),
+        "liquidity_by_coin": liquidity,
+    }
+
+    cmc = [
+        {
+            "symbol": coin,
+            "name": coin,
+            "quote": {
+                "USD": {
+                    "market_cap": float(rng.lognormal(18, 3)),
+                    "fully_diluted_market_cap": float(rng.lognormal(19, 3)),
+                }
+            },
+        }
+        for coin in coins
+    ]
+    return {
+        "hl": [{"universe": universe}, asset_ctxs],
+        "thunderhead": thunderhead,
+        "cmc": cmc,
+    }
+
+
+def run(
+    recos: Any, n_markets: int, repeat: int = 3, days: int = 100
+) -> dict[str, float]:
+    """Best-of-`repeat` seconds of every `STEPS` entry at one scale.
+
+    Runs in a temporary directory, whose fixtures and outputs are removed
+    afterwards, with a fresh `MARKET_CACHE` and, on every repeat, a fresh
+    `SYMBOLS` normalizer; both are restored after. The steps' prints and
+    warnings are suppressed.
+    """
+    timings: dict[str, float] = {}
+    symbols, market_cache = recos.SYMBOLS, recos.MARKET_CACHE
+
+    def cold_symbols() -> SymbolNormalizer:
+        return SymbolNormalizer(
+            symbols.suffixes,
+            symbols.aliases,
+            symbols.exch_aliases,
+            symbols.maxsize,
+        )
+
+    def timed(step: str, fn: Callable[[], Any]) -> Any:
+        best = float("inf")
+        for _ in range(repeat):
+            recos.SYMBOLS = cold_symbols()
+            start = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - start)
+        timings[step] = best
+        return result
+
+    def render_fresh(df: pd.DataFrame) -> None:
+        # render_outputs skips shards already written, so every repeat
+        # renders into a new directory
+        os.chdir(tempfile.mkdtemp(dir=tmp))
+        try:
+            recos.render_outputs(df, show=False)
+        finally:
+            os.chdir(tmp)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            recos.SYMBOLS = cold_symbols()
+            recos.MARKET_CACHE = MarketCache(ttl=market_cache.ttl)
+            raw = write_fixtures(recos, n_markets, days)
+            with (
+                contextlib.redirect_stdout(io.StringIO()),
+                warnings.catch_warnings(),
+            ):
+                warnings.simplefilter("ignore")
+                processed = {
+                    "cmc": recos.process_cmc_data(raw["cmc"]),
+                    "ref": timed(
+                        "process_reference_exch_data",
+                        recos.process_reference_exch_data,
+                    ),
+                    "windows": timed(
+                        "process_reference_exch_windows",
+                        recos.process_reference_exch_windows,
+                    ),
+                    "hl": recos.process_hl_data(raw["hl"]),
+                    "thunderhead": timed(
+                        "process_thunderhead_data",
+                        lambda: recos.process_thunderhead_data(
+                            raw["thunderhead"]
+                        ),
+                    ),
+                }
+                processed["windows"] = processed["windows"].reindex(
+                    processed["ref"].index, fill_value=0
+                )
+                df = recos.merge_stage(processed)
+                scores = timed("build_scores", lambda: recos.build_scores(df))
+                df = pd.concat([df, scores], axis=1)
+                df["Recommendation"] = timed(
+                    "generate_recommendations",
+                    lambda: recos.generate_recommendations(df),
+                )
+                timed("render_outputs", lambda: render_fresh(df))
+        finally:
+            recos.SYMBOLS, recos.MARKET_CACHE = symbols, market_cache
+            os.chdir(cwd)
+    return timings
+
+
+def compare(
+    timings: dict[str, float],
+    baseline: dict[str, float] | None,
+    threshold: float,
+) -> pd.DataFrame:
+    """Timings against a baseline run, flagging regressions.
+
+    A step regressed when it is more than `threshold` (a fraction) slower
+    than in `baseline`, by at least `MIN_REGRESSION_S`.
+    """
+    table = pd.DataFrame({"seconds": pd.Series(timings)})
+    table["baseline"] = pd.Series(baseline or {}, dtype=float)
+    table["change %"] = (table.seconds / table.baseline - 1) * 100
+    table["regressed"] = (table.seconds > table.baseline * (1 + threshold)) & (
+        table.seconds - table.baseline >= MIN_REGRESSION_S
+    )
+    return table
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Time the delisting pipeline's processing stages on "
+        "synthetic data and compare them with the last stored run."
+    )
+    parser.add_argument(
+        "--markets",
+        nargs="+",
+        type=int,
+        default=[500, 5000],
+        help="numbers of reference exchange markets to benchmark",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--results", default=RESULTS_JSON)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="fraction a step may slow down before it fails",
+    )
+    parser.add_argument(
+        "--no-save",
+        action="store_true",
+        help="compare without storing this run",
+    )
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.getcwd())
+    import build_delisting_recos as recos
+
+    history: list[dict[str, Any]] = []
+    if os.path.exists(args.results):
+        with open(args.results) as f:
+            history = json.load(f)
+
+    failed = False
+    for n_markets in args.markets:
+        timings = run(recos, n_markets, args.repeat)
+        previous = [r for r in history if r["markets"] == n_markets]
+        baseline = previous[-1] if previous else None
+        table = compare(
+            timings, baseline and baseline["timings"], args.threshold
+        )
+        against = (
+            f" vs {baseline['commit'] or baseline['time']}" if baseline else ""
+        )
+        print(f"{n_markets} markets{against}")
+        print(table.to_string(float_format="{:.3f}".format, na_rep=""))
+        failed |= bool(table.regressed.any())
+        history.append(
+            {
+                "commit": _commit(),
+                "time": datetime.datetime.now().isoformat(),
+                "markets": n_markets,
+                "repeat": args.repeat,
+                "timings": timings,
+            }
+        )
+
+    if not args.no_save:
+        with open(args.results, "w") as f:
+            json.dump(history, f, indent=1)
+    print("FAIL" if failed else "PASS")
+    return int(failed)
+
+
+# ────────────────────────────────────────────────────────────────
+# private
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""recommend() against the row-by-row classifier it replaced."""
+
+import os
+
+import pandas as pd
+import pytest
+
+from delisting_recos import recommend
+
+FIXTURE_CSV = os.path.join(
+    os.path.dirname(__file__), "fixtures", "recommend_inputs.csv"
+)
+# the tiers of build_delisting_recos.py
+SCORE_UB: dict[int, float] = {0: 62, 3: 75, 5: 85, 10: 101}
+SCORE_LB: dict[int, float] = {0: 0, 3: 37, 5: 48, 10: 60}
+
+
+def generate_recommendation(row: pd.Series) -> str:
+    # the original, applied with df.apply(..., axis=1)
+    high_lev = (
+        row["Score"] < SCORE_LB[min(max(SCORE_LB), int(row["Max Lev. on HL"]))]
+    )
+    low_lev = (
+        row["Score"]
+        >= SCORE_UB[min(max(SCORE_UB), int(row["Max Lev. on HL"]))]
+    )
+
+    if row["Max Lev. on HL"] > 3 and high_lev:
+        return "Dec. Lev."
+    if row["Max Lev. on HL"] == 3 and high_lev:
+        return "Delist"
+    if row["Max Lev. on HL"] == 0 and low_lev:
+        return "List"
+    if row["Max Lev. on HL"] > 0 and low_lev:
+        return "Inc. Lev."
+    return ""
+
+
+@pytest.fixture
+def inputs() -> pd.DataFrame:
+    return pd.read_csv(FIXTURE_CSV)
+
+
+def test_matches_row_by_row(inputs: pd.DataFrame) -> None:
+    expected = inputs.apply(generate_recommendation, axis=1)
+    labels = recommend(
+        inputs["Score"], inputs["Max Lev. on HL"], SCORE_LB, SCORE_UB
+    )
+    assert list(labels) == expected.tolist()
+
+
+def test_every_recommendation_is_covered(inputs: pd.DataFrame) -> None:
+    labels = inputs.apply(generate_recommendation, axis=1)
+    assert set(labels) == {"", "Dec. Lev.", "Delist", "List", "Inc. Lev."}
+
+
+@pytest.mark.parametrize("lev", [1, 4, 7.5])
+def test_leverage_without_tier_raises(
+    inputs: pd.DataFrame, lev: float
+) -> None:
+    inputs.loc[len(inputs) // 2, "Max Lev. on HL"] = lev
+    with pytest.raises(KeyError):
+        inputs.apply(generate_recommendation, axis=1)
+    with pytest.raises(KeyError):
+        recommend(
+            inputs["Score"], inputs["Max Lev. on HL"], SCORE_LB, SCORE_UB
+        )